@@ -49,7 +49,8 @@
 # All the column names that might be shown on a SolidWorks BOM for
 # part numbers.  Different names occur when templates used to create
 # BOMs are not consistent.  Note that names are case sensitive, so
-# "Part Number" is not the same as "PART NUMBER".
+# "Part Number" is not the same as "PART NUMBER".  If more than one of the
+# names is found in a BOM, the one listed first is used.
 # part_num_sw = ["PARTNUMBER", "PART NUMBER", "Part Number"]
 
 
@@ -155,3 +156,125 @@
 
 
 
+
+
+# For part numbers found in only the SolidWorks BOM or only in the SyteLine
+# BOM, suggest a likely mistyped match from the other BOM; e.g. suggest
+# 2648-0300-001 for 2648-0300-01.  Suggestions are shown in a column named
+# Suggest.
+# fuzzy = False
+
+
+# Maximum number of character edits (insertions, deletions, or
+# substitutions) between two part numbers for them to be suggested as a
+# match.  (See fuzzy above.)
+# fuzzy_distance = 2
+
+
+# Read multilevel SyteLine BOMs this many rows at a time and keep only those
+# assemblies for which a matching SolidWorks BOM was found.  Use this for
+# very large SyteLine exports that contain many top level assemblies.  0
+# means that the whole file is read at once.
+# chunksize = 0
+
+
+# Read a SyteLine BOM from the clipboard in addition to BOMs read from
+# files.  (True or False)
+# clipboard = False
+
+
+# Seconds to wait for the clipboard to be read before giving up.
+# clipboard_timeout = 5
+
+
+# Read files, compare BOMs, and collect results concurrently.  The value is
+# the number of files that may be read ahead of the comparisons, and thus
+# limits how many BOMs are held in memory.  0 means that each step is done
+# one after the other.
+# pipeline = 0
+
+
+# When results are broken up across multiple sheets (the -c option), write
+# them to several Excel files, each containing this many assemblies, plus an
+# index file named bomcheck_index.xlsx.  0 means write one Excel file.
+# group = 0
+
+
+# Search the first rows of each BOM for the row containing column headings
+# (i.e. a row that contains one of the names of each required column listed
+# above).  If False, or if no such row is found, skiprows_sw and skiprows_sl
+# are used instead.  (True or False)
+# autoheader = True
+
+
+# Number of rows at the top of a BOM that are searched for the row
+# containing column headings.  (See autoheader above.)
+# header_scan_rows = 10
+
+
+# Read every sheet of an Excel file that has more than one sheet.  Each
+# sheet is a BOM whose assembly number is the name of the sheet.  (True or
+# False)
+# multisheet = False
+
+
+# Before the BOM check, read only the first rows of each file to report
+# files that can't be read, files missing essential columns, and unpaired
+# files.  '' means don't, 'warn' means report problems only, and 'abort'
+# means stop if a file can't be processed.
+# preflight = ''
+
+
+# Also check files whose names don't end with _sw or _sl.  Whether such a
+# file is a SolidWorks or a SyteLine BOM is determined from its column
+# headings (ITEM NO. or UM), and its assembly number from its name or, if
+# the name isn't a part number, from the BOM itself.  (True or False)
+# sniff = False
+
+
+# Show only rows of BOM checks that have an X in the i, q, d, or u columns.
+# A sheet named Summary shows how many rows of each BOM check matched.
+# (True or False)
+# mismatches = False
+
+
+# Used when mismatches = True.  Also show this many rows above and below
+# each row that has an X.
+# context = 0
+
+
+# If the quantities of an item in SW and SL BOMs differ by more than this,
+# an X is shown in the q column.  Quantities are compared exactly (as
+# integer multiples of 0.000001), so there is no floating point error.
+# tolerance = 0.005
+
+
+# Tolerances for particular units of measure.  These override the tolerance
+# above; e.g. {'EA': 0, 'FT': 0.01}
+# tolerances = {}
+
+
+# Also compare the structures of multilevel SW and SL BOMs.  Parts and
+# subassemblies that were moved to a different parent, added, removed, or
+# requantified are shown on a sheet named Tree Diff.  (True or False)
+# treediff = False
+
+
+# Report the memory used by each stage of a BOM check and by the reading of
+# each file, along with the lines of code that allocated the most memory.
+# (True or False)
+# memprofile = False
+
+
+# Memory, in MB, that a BOM check may use.  SL files too large to be read
+# whole within it are read in chunks (see chunksize above), and if it is
+# exceeded anyway, the BOM check stops with a report of the memory used by
+# each stage.  0 means no budget.
+# memory_budget = 0
+
+
+# Build a part master from all SL BOMs and check the descriptions and U/Ms
+# of SW parts against it once per part rather than once per assembly.  SL
+# parts whose descriptions differ from one SL BOM to another are shown on a
+# sheet named SL Descriptions.  (True or False)
+# partmaster = False
@@ -32,6 +32,28 @@ import re
 import datetime
 import pytz
 import fnmatch
+import numpy as np
+import io
+import threading
+import queue
+import collections
+import itertools
+import zlib
+import csv
+import json
+import codecs
+import contextvars
+import copy
+import collections.abc
+import pickle
+import hashlib
+import concurrent.futures
+import multiprocessing
+import contextlib
+import tracemalloc
+import zipfile
+import functools
+import weakref
 warnings.filterwarnings('ignore')  # the program has its own error checking.
 pd.set_option('display.max_rows', 150)
 pd.set_option('display.max_columns', 10)
@@ -44,8 +66,9 @@ def get_version():
 
 
 def set_globals():
-    ''' Create a global variables including the primary one named cfg.
-    cfg is a dictionary containing settings used by this program.
+    ''' Create the default run context (see the class RunContext), including
+    its settings, cfg.  cfg is a dictionary containing settings used by this
+    program.  Each BOM check starts with a copy of these settings.
     
     set_globals() is ran when bomcheck first starts up.
     
@@ -53,10 +76,9 @@ def set_globals():
     if it can be located and if values have been established there.
     Otherwise set_globals() creates its on settings for cfg.
     '''
-    global cfg, printStrs, excelTitle
+    global _default_context
     cfg = {}
     printStrs = ''
-    excelTitle = []
     # try to import the file named bc_config.py.
     usrPrf = os.getenv('USERPROFILE')  # on my win computer, USERPROFILE = C:/Users/k_carlton
     if usrPrf:
@@ -94,11 +116,24 @@ def set_globals():
              ('drop', ['3*-025']),  ('exceptions', []), 
              ('from_um', 'inch'),   ('timezone', 'US/Central'),
              ('to_um', 'feet'),     ('skiprows_sw', 1), 
-             ('skiprows_sl', 0)]
+             ('skiprows_sl', 0),    ('fuzzy', False),
+             ('fuzzy_distance', 2), ('chunksize', 0),
+             ('clipboard', False),  ('clipboard_timeout', 5),
+             ('pipeline', 0),       ('group', 0),
+             ('autoheader', True),  ('header_scan_rows', 10),
+             ('multisheet', False), ('preflight', ''),
+             ('sniff', False),      ('mismatches', False),
+             ('context', 0),        ('tolerance', 0.005),
+             ('tolerances', {}),    ('treediff', False),
+             ('memprofile', False), ('memory_budget', 0),
+             ('partmaster', False)]
     # Give to bomcheck names of columns that it can expect to see in BOMs.  If
     # one of the names, except length names, in each group shown in brackets
-    # below is not found, then bomcheck will fail.
-    list2 = [('part_num',  ["PARTNUMBER", "PART NUMBER", "Part Number", "Item", "Material"]),
+    # below is not found, then bomcheck will fail.  If more than one name in
+    # a group is found in a BOM, the name listed first is used.  (Material
+    # is ahead of Item because when a SL BOM shows Material, the Item column
+    # shown with it is not the part number.)
+    list2 = [('part_num',  ["PARTNUMBER", "PART NUMBER", "Part Number", "Material", "Item"]),
              ('qty',       ["QTY", "QTY.", "Qty", "Quantity", "Qty Per"]),
              ('descrip',   ["DESCRIPTION", "Material Description", "Description"]),
              ('um_sl',     ["UM", "U/M"]),     # not required in a SW BOM
@@ -110,12 +145,182 @@ def set_globals():
     cfg['accuracy'] = int(cfg['accuracy'])  
     cfg['skiprows_sw'] = int(cfg['skiprows_sw'])
     cfg['skiprows_sl'] = int(cfg['skiprows_sl'])
+    cfg['fuzzy_distance'] = int(cfg['fuzzy_distance'])
+    cfg['chunksize'] = int(cfg['chunksize'])
+    cfg['clipboard_timeout'] = float(cfg['clipboard_timeout'])
+    cfg['pipeline'] = int(cfg['pipeline'])
+    cfg['group'] = int(cfg['group'])
+    cfg['header_scan_rows'] = int(cfg['header_scan_rows'])
+    cfg['context'] = int(cfg['context'])
+    cfg['tolerance'] = float(cfg['tolerance'])
+    cfg['memory_budget'] = float(cfg['memory_budget'])
+    cfg['tolerances'] = {str(k).strip().upper(): float(v) for k, v in cfg['tolerances'].items()}
     for k, v in list2:
         insert_into_cfg(k, v, col=True)
+    # settings that can only be set from the command line or by the bomcheck
+    # function (see the bomcheck function for their descriptions)
+    cfg['sl_stdin'] = None
+    cfg['sw_stdin'] = None
+    cfg['shard'] = None
+    cfg['manifest'] = None
+    cfg['checkpoint'] = None
+    cfg['resume'] = False
+    cfg['adjacency'] = None
+    _default_context = RunContext(cfg, printStrs)
                              
     
+class RunContext:
+    ''' The state of one BOM check: its settings (cfg), the messages it has
+    printed (printStrs), and the title of its BOM (excelTitle, used in the
+    header of the Excel file).  Functions of this program use the state of
+    the current run context (see the function run_context), so BOM checks
+    with different settings can be done at the same time in different
+    threads, each in its own context.  A run context can be pickled and so
+    can be passed to another process.
+
+    Parmeters
+    =========
+
+    cfg: dictionary or None
+        Settings.  If None, a copy of the settings established by the
+        set_globals function (i.e. defaults and values from bc_config.py)
+        is used.  Default: None
+
+    printStrs: string
+        Messages printed so far.  Default: ''
+
+    Examples
+    ========
+
+    >>> ctx = RunContext()
+
+    >>> ctx.run(bomcheck, "C:/folder", d=True)
+
+    >>> print(ctx.printStrs)
+    '''
+    def __init__(self, cfg=None, printStrs=''):
+        self.cfg = copy.deepcopy(_default_context.cfg) if cfg is None else cfg
+        self.printStrs = printStrs
+        self.excelTitle = []
+        self.memrecords = []   # see the function memory_stage
+        self.tracing = False   # see the function ends_memory_monitoring
+        self.budget = None     # see the function start_memory_budget
+        self.quiet = False     # if True, echo doesn't print
+        self.digests = {}      # see the function share_identical_boms
+        self.digest_counts = collections.Counter()
+        self.compare_cache = {}  # see the function compare_boms
+        self.compare_hits = 0
+        self.partmaster = None   # see the function build_part_master
+        self.partmaster_of = None
+        self.partmaster_inconsistent = None
+        self.partmaster_results = {}
+        self._lock = threading.Lock()
+
+    def add(self, printStr):
+        ''' Add printStr to printStrs.  Safe to call from several threads.'''
+        with self._lock:
+            self.printStrs += printStr
+
+    def run(self, func, *args, **kwargs):
+        ''' Call func(*args, **kwargs) with this as the current run context
+        and return what func returns.'''
+        token = _run_context.set(self)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _run_context.reset(token)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']     # locks can't be pickled
+        state['digests'] = {}  # nor can weak references
+        state['budget'] = None # nor can a watchdog's event
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class _CfgProxy(collections.abc.MutableMapping):
+    ''' The cfg of the current run context.  Thus cfg['accuracy'], for
+    example, is the accuracy setting of the BOM check being done by the
+    thread that evaluates it.'''
+    def __getitem__(self, key):
+        return run_context().cfg[key]
+
+    def __setitem__(self, key, value):
+        run_context().cfg[key] = value
+
+    def __delitem__(self, key):
+        del run_context().cfg[key]
+
+    def __iter__(self):
+        return iter(run_context().cfg)
+
+    def __len__(self):
+        return len(run_context().cfg)
+
+    def __repr__(self):
+        return repr(run_context().cfg)
+
+
+def run_context():
+    ''' Return the current run context (see the class RunContext).  This is
+    the one whose run method is executing in this thread or, if none is, the
+    one created by the set_globals function.'''
+    return _run_context.get(_default_context)
+
+
+def echo(printStr):
+    ''' Print printStr and add it to the printStrs of the current run
+    context.  Nothing is printed if the run context is quiet.'''
+    ctx = run_context()
+    ctx.add(printStr)
+    if not ctx.quiet:
+        print(printStr)
+
+
+def __getattr__(name):
+    ''' printStrs and excelTitle of the module are those of the current run
+    context; e.g. bomcheck.printStrs.'''
+    if name in ['printStrs', 'excelTitle']:
+        return getattr(run_context(), name)
+    raise AttributeError("module 'bomcheck' has no attribute " + repr(name))
+
+_run_context = contextvars.ContextVar('bomcheck_run_context')
+cfg = _CfgProxy()
+
+
+def ends_memory_monitoring(func):
+    ''' Decorator for a function that does a BOM check.  When func returns,
+    if its BOM check was the last one using tracemalloc (see the function
+    memory_stage) and tracing was started by memory_stage, tracing is
+    stopped.  Otherwise later BOM checks done by the same process, e.g. by
+    the GUI, would be slowed down.  Likewise the enforcement of the memory
+    budget is ended (see the function stop_memory_budget).'''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            ctx = run_context()
+            stop_memory_budget(ctx)
+            with _tracing_lock:
+                if ctx.tracing:
+                    ctx.tracing = False
+                    _tracing['runs'] -= 1
+                    if _tracing['runs'] == 0 and _tracing['started']:
+                        tracemalloc.stop()
+                        _tracing['started'] = False
+    return wrapper
+
+_tracing = {'runs': 0, 'started': False}   # BOM checks using tracemalloc
+_tracing_lock = threading.Lock()
+
+
 def showSettings():
-    return cfg
+    return run_context().cfg
 
 
 def main():
@@ -136,11 +341,18 @@ def main():
 
     $ python bomcheck.py --help
 
+    $ python bomcheck.py "*" --shard 2/4
+
+    $ python bomcheck.py merge "bomcheck_shard*.parquet"
+
     '''
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        merge_main(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
                         description='Program compares SolidWorks BOMs to SyteLine BOMs.  ' +
                         'Output is sent to a Microsoft Excel spreadsheet.')
-    parser.add_argument('filename', help='Name of file containing a BOM.  Name ' +
+    parser.add_argument('filename', nargs='?', default='*', help='Name of file containing a BOM.  Name ' +
                         'must end with _sw.xlsx, _sl.xlsx. _sw.csv, or ' +
                         '_sl.csv.  Enclose filename in quotes!  An asterisk, *, ' +
                         'caputures multiple files.  Examples: "6890-*", "*".  ' +
@@ -176,6 +388,120 @@ def main():
                         'The first row to read from BOMs is meant to be the row containing ' +
                         'column headings such as Item, Description, Qty Per, etc.', 
                         default=cfg['skiprows_sl'], metavar='value')
+    parser.add_argument('-z', '--fuzzy', action='store_true', default=False,
+                        help='For part nos. found in only the SolidWorks BOM or ' +
+                        'only the SyteLine BOM, suggest a likely mistyped match ' +
+                        'from the other BOM.  Suggestions are shown in a column ' +
+                        'named Suggest.')
+    parser.add_argument('--fuzzy_distance', help='Maximum number of character ' +
+                        'edits allowed between two part nos. for them to be ' +
+                        'suggested as a match (see --fuzzy)',
+                        default=cfg['fuzzy_distance'], metavar='value')
+    parser.add_argument('--chunksize', help='Read multilevel SyteLine BOMs ' +
+                        'this many rows at a time and keep only those assemblies ' +
+                        'that have a matching SolidWorks BOM.  Use for very large ' +
+                        'SyteLine exports that contain many assemblies.  0 means ' +
+                        'read the whole file at once.', default=cfg['chunksize'],
+                        metavar='value')
+    parser.add_argument('--clipboard', action='store_true', default=False,
+                        help='Also read a SyteLine BOM from the clipboard')
+    parser.add_argument('--clipboard_timeout', help='Seconds to wait for the ' +
+                        'clipboard to be read before giving up (see --clipboard)',
+                        default=cfg['clipboard_timeout'], metavar='value')
+    parser.add_argument('--sl-stdin', nargs='?', const='TOPLEVEL', default=None,
+                        help='Also read a SyteLine BOM (tab or comma delimited text) ' +
+                        'piped to stdin.  Optionally give the assembly no. of the ' +
+                        'BOM.  If not given, the BOM must contain a Level column.',
+                        metavar='assy')
+    parser.add_argument('--sw-stdin', default=None, help='Also read a SolidWorks ' +
+                        'BOM (tab or comma delimited text) piped to stdin.  The ' +
+                        'assembly no. of the BOM must be given.', metavar='assy')
+    parser.add_argument('-p', '--pipeline', help='Read files, compare BOMs, and ' +
+                        'collect results concurrently.  value is the number of ' +
+                        'files that may be read ahead of the comparisons.  0 means ' +
+                        'do each step one after the other.  Not used along with ' +
+                        '--chunksize, --sw-stdin, --sl-stdin, or --clipboard.',
+                        default=cfg['pipeline'],
+                        metavar='value')
+    parser.add_argument('-g', '--group', help='Used with --sheets.  Instead of ' +
+                        'one Excel file, write results to several Excel files, ' +
+                        'each containing value assemblies, plus an index file ' +
+                        'named bomcheck_index.xlsx.  Files are written in ' +
+                        'parallel.  0 means write one Excel file.',
+                        default=cfg['group'], metavar='value')
+    parser.add_argument('--noautoheader', action='store_true', default=False,
+                        help="Don't search the first rows of a BOM for the row " +
+                        'containing column headings.  Use skiprows_sw and ' +
+                        'skiprows_sl instead.')
+    parser.add_argument('-m', '--multisheet', action='store_true', default=False,
+                        help='Read every sheet of an Excel file.  Each sheet ' +
+                        'is a BOM whose assembly no. is the name of the sheet.  ' +
+                        '(Only applies to Excel files with more than one sheet.)')
+    parser.add_argument('--shard', default=None, help='Check only part i of N ' +
+                        'parts of the assemblies, e.g. 2/4.  Assemblies are ' +
+                        'assigned to parts by a hash of their assy no.  Results ' +
+                        'go to a file named bomcheck_shard_iofN.parquet rather ' +
+                        'than to an Excel file.  Combine results with: ' +
+                        'bomcheck merge "bomcheck_shard*.parquet"', metavar='i/N')
+    parser.add_argument('--manifest', default=None, help='A csv or json file ' +
+                        'listing the BOMs to check.  Columns (keys): assy, ' +
+                        'sw_path, sl_path, and optionally options, e.g. ' +
+                        '"accuracy=3;drop=1".  When given, filename is ignored.',
+                        metavar='file')
+    parser.add_argument('--checkpoint', default=None, help='Save the result of ' +
+                        'each assembly to this directory as soon as it has been ' +
+                        'checked, so that an interrupted run can be resumed ' +
+                        '(see --resume).', metavar='dir')
+    parser.add_argument('--resume', action='store_true', default=False,
+                        help='Resume an interrupted run.  Assemblies whose results ' +
+                        'are in the checkpoint directory (default: ' +
+                        'bomcheck_checkpoint) and whose files have not changed ' +
+                        'are not checked again.')
+    parser.add_argument('--tolerance', help='If SW and SL quantities ' +
+                        'differ by more than this, show an X in the q column.  ' +
+                        '(Per unit of measure tolerances can be set in ' +
+                        'bc_config.py.)', default=cfg['tolerance'], metavar='value')
+    parser.add_argument('--adjacency', default=None, help='Instead of ' +
+                        'checking BOMs, write the parent/child structure of ' +
+                        'all SW and SL BOMs to this file as a table (top ' +
+                        'assy, parent, child, level, qty, unit, source).  ' +
+                        'Its name must end with .parquet or .feather.',
+                        metavar='file')
+    parser.add_argument('--partmaster', action='store_true', default=False,
+                        help='Check descriptions and U/Ms of SW parts once per ' +
+                        'part against a part master built from all SL BOMs, and ' +
+                        'show SL parts whose descriptions differ from one SL BOM ' +
+                        'to another on a sheet named SL Descriptions.')
+    parser.add_argument('--treediff', action='store_true', default=False,
+                        help='Also compare the structures of multilevel SW and ' +
+                        'SL BOMs, showing on a sheet named Tree Diff parts ' +
+                        'and subassemblies that were moved, added, removed, ' +
+                        'or requantified.')
+    parser.add_argument('--mismatches', action='store_true', default=False,
+                        help='Show only rows of BOM checks that have an X in ' +
+                        'the i, q, d, or u columns.  A sheet named Summary ' +
+                        'shows how many rows of each BOM check matched.')
+    parser.add_argument('--context', help='Used with --mismatches.  Also ' +
+                        'show this many rows above and below each row with ' +
+                        'an X.', default=cfg['context'], metavar='N')
+    parser.add_argument('--sniff', action='store_true', default=False,
+                        help='Also check files whose names don\'t end with _sw ' +
+                        'or _sl.  Whether such a file is a SW or SL BOM is ' +
+                        'determined from its column headings.')
+    parser.add_argument('--preflight', choices=['warn', 'abort'], default='',
+                        help='Before the BOM check, read only the first rows ' +
+                        'of each file to find missing columns, unreadable ' +
+                        'files, and SW files without a SL file of the same ' +
+                        'name.  With abort, stop if a file can\'t be checked.')
+    parser.add_argument('--memprofile', action='store_true', default=False,
+                        help='Report the memory used by each stage of the BOM ' +
+                        'check and by the reading of each file, and the lines ' +
+                        'of code that allocated the most memory.')
+    parser.add_argument('--memory_budget', help='Memory, in MB, that the BOM ' +
+                        'check may use.  Large SL files are read in chunks ' +
+                        'if reading them whole would exceed it, and the check ' +
+                        'stops with a report if it is exceeded.  0 means no ' +
+                        'budget.', default=cfg['memory_budget'], metavar='MB')
     
     
     if len(sys.argv)==1:
@@ -183,9 +509,13 @@ def main():
         sys.exit(1)
     args = parser.parse_args()
     
-    bomcheck(args.filename, vars(args))
+    try:
+        bomcheck(args.filename, vars(args))
+    except MemoryError:   # memory budget exceeded; a report was printed
+        sys.exit(1)
 
 
+@ends_memory_monitoring
 def bomcheck(fn, dic={}, **kwargs):
     '''  
     This is the primary function of the bomcheck program and acts as a hub
@@ -213,8 +543,10 @@ def bomcheck(fn, dic={}, **kwargs):
     BOMs.  Finally this function will also return DataFrame objects of the 
     results.
 
-    calls: gatherBOMs_from_fnames, collect_checked_boms, concat_boms, 
-    export2excel, get_fnames
+    calls: apply_settings, gatherBOMs_from_fnames, collect_checked_boms,
+    pipeline_check, report_results,
+    check_manifest, checkpointed_check, preflight_check,
+    concat_boms, export2excel, export_sharded, get_fnames
 
     Parmeters
     =========
@@ -260,6 +592,146 @@ def bomcheck(fn, dic={}, **kwargs):
         f: bool
             If True, follow symbolic links when searching for files to process.
             Default: False
+
+        z: bool
+            If True, pair up part nos. that are found in only the SW BOM or
+            only the SL BOM with a likely mistyped pn from the other BOM.
+            Suggestions are shown in a column named Suggest.  Default: False
+
+        zd: int
+            Maximum number of character edits between two pns for them to be
+            suggested as a match when z=True.  Default: 2
+
+        cs: int
+            Read multilevel SL BOMs this many rows at a time, and keep only
+            those assemblies for which a matching SW BOM exists.  0 means read
+            the whole file at once.  Default: 0
+
+        cb: bool
+            If True, also read a SL BOM from the clipboard.  Default: False
+
+        cbt: float
+            Seconds to wait for the clipboard to be read.  Default: 5
+
+        sl_stdin: string
+            Also read a SL BOM piped to stdin.  The value is the assy no. of
+            the BOM, or "TOPLEVEL" if the BOM contains a Level column.
+            Default: None
+
+        sw_stdin: string
+            Also read a SW BOM piped to stdin.  The value is the assy no. of
+            the BOM.  Default: None
+
+        p: int
+            If nonzero, read files, compare BOMs, and collect results
+            concurrently (see the function pipeline_check).  The value is the
+            number of files that may be read ahead of the comparisons.  Not
+            used, and a message is printed, if cs, sw_stdin, sl_stdin, or cb
+            is also set, because SL files would then not be read in chunks,
+            or BOMs from stdin or the clipboard would be ignored.  Default: 0
+
+        g: int
+            Only used when c=True.  If nonzero, write results to several
+            Excel files, each holding g assemblies, plus an index file (see
+            the function export_sharded).  Default: 0
+
+        ah: bool
+            If True, search the first rows of each BOM for the row containing
+            column headings (see the function find_header_row).  If False,
+            or if no such row is found, the skiprows_sw and skiprows_sl
+            settings are used.  Default: True
+
+        m: bool
+            If True, read every sheet of an Excel file that has more than one
+            sheet.  Each sheet is a BOM whose assy no. is the sheet's name.
+            Default: False
+
+        sh: string
+            Check only part i of N parts of the assemblies, e.g. "2/4".  (see
+            the functions in_shard and write_partial_results)  Default: None
+
+        mf: string
+            Name of a manifest file listing the SW/SL pairs to check (see the
+            function check_manifest).  If given, fn is ignored.  Default: None
+
+        ck: string
+            Name of a directory to which the result of each assembly is saved
+            as soon as it has been checked (see the function
+            checkpointed_check).  Default: None
+
+        r: bool
+            If True, resume an interrupted run from the checkpoint directory
+            (ck, or bomcheck_checkpoint if ck isn't given).  Default: False
+
+        tol: float
+            If SW and SL quantities differ by more than this, show an X in
+            the q column.  Default: 0.005
+
+        tols: dict
+            Tolerances for particular units of measure, overriding tol; e.g.
+            {'EA': 0, 'FT': 0.01}.  Default: {}
+
+        mp: bool
+            If True, report the memory used by each stage of the BOM check
+            (see the function memory_stage).  Default: False
+
+        mb: float
+            Memory budget in MB.  If exceeded, a MemoryError is raised.
+            (see the function memory_stage)  Default: 0, i.e. no budget
+
+        adj: string
+            Name of a Parquet (.parquet) or Feather (.feather) file.  If
+            given, BOMs are read and their structure written to this file
+            (see the function export_adjacency), but not checked, and
+            (None, None) is returned.  The pipeline, checkpoint, resume, and
+            shard settings are then ignored.  Can't be used with a
+            manifest.  Requires pyarrow.  Default: None
+
+        pm: bool
+            If True, build a part master from all SL BOMs (see the function
+            build_part_master) and check the descriptions and U/Ms of SW
+            parts against it.  Not done if a pipeline is used.
+            Default: False
+
+        td: bool
+            If True, also compare the structures of multilevel BOMs and put
+            the results on a sheet named Tree Diff (see the function
+            tree_diff).  Not done if a pipeline, manifest, or checkpoint is
+            used; a message says so.  Default: False
+
+        mm: bool
+            If True, show only rows of merged SW/SL BOMs that have an X in
+            the i, q, d, or u columns, and add a sheet named Summary to the
+            Excel file (see the function filter_mismatches).  Default: False
+
+        ctx: int
+            Used with mm.  Also show this many rows above and below each row
+            with an X.  Default: 0
+
+        sn: bool
+            If True, files whose names don't end with _sw or _sl are
+            classified as SW or SL BOMs by their contents (see the function
+            sniff_bom_file).  Default: False
+
+        pf: string
+            "warn" or "abort".  If set, run the function preflight_check
+            before the BOM check.  If "abort" and a problem is found that
+            prevents a file from being checked, stop.  Default: ''
+
+        progress: function
+            Function called as files are read and as BOMs are compared, e.g.
+            by a GUI to show a progress bar.  It is called like this:
+            progress(stage, i, n, name); where stage is "read" or "compare",
+            i is the no. of items done so far out of n (n is 0 if the total
+            isn't known yet), and name is the filename or assy no. about to
+            be processed.  Default: None
+
+        cancel: function
+            Function that takes no arguments and returns True if the BOM check
+            should be stopped.  It is checked between files, between BOMs,
+            and between the stages of the BOM check.  If the check is stopped,
+            (None, None) is returned and no Excel file is written.
+            Default: a function that always returns False
     
     Returns
     =======
@@ -292,9 +764,123 @@ def bomcheck(fn, dic={}, **kwargs):
     >>> bomcheck("C:/folder/*") # all files, one level deep
     
     >>> bomcheck(["C:/folder1/*", "C:/folder2/*"], d=True, u="John Doe") 
+
+    Each BOM check is done in a run context of its own (see the class
+    RunContext), starting with the settings established by set_globals.
+    Thus BOM checks can be done at the same time in different threads.
+    To see the messages printed by a BOM check, do it in a run context
+    created for it:
+
+    >>> ctx = RunContext()
+    >>> ctx.run(bomcheck, "C:/folder")
+    >>> ctx.printStrs
     
     '''
-    global printStrs, cfg
+    if run_context() is _default_context:
+        return RunContext().run(bomcheck, fn, dic, **kwargs)
+    apply_settings(dic, **kwargs)
+    c = (dic.get('sheets') if dic.get('sheets') else kwargs.get('c', False))
+    u =  kwargs.get('u', 'unknown')  
+    x = kwargs.get('x', True)
+    f = kwargs.get('f', False)
+    progress = kwargs.get('progress')
+    cancel = kwargs.get('cancel', lambda: False)
+
+        
+    if isinstance(fn, str) and fn.startswith('[') and fn.endswith(']'):
+        fn = eval(fn)  # change a string to a list
+    elif isinstance(fn, str):
+        fn = [fn]
+
+    if cfg['adjacency'] and not cfg['adjacency'].lower().endswith(('.parquet', '.feather')):
+        printStr = ('\nError: the name of the adjacency table file, ' + cfg['adjacency'] +
+                    ',\nmust end with .parquet or .feather.\n')
+        echo(printStr)
+        return None, None
+    if cfg['adjacency'] and cfg['manifest']:
+        printStr = ('\nError: the adjacency setting can\'t be used along with a manifest.\n'
+                    'Give the names of the BOM files instead.\n')
+        echo(printStr)
+        return None, None
+
+    if not cfg['manifest']:
+        fn = get_fnames(fn, followlinks=f)  # get filenames with any extension.   
+        
+    if cfg['drop']:
+        printStr = '\ndrop = ' + str(cfg['drop']) + '\nexceptions = ' + str(cfg['exceptions']) + '\n'
+        echo(printStr)
+
+    if (cfg['preflight'] and not cfg['manifest'] and not preflight_check(fn)
+            and cfg['preflight'] == 'abort'):
+        printStr = '\nBOM check aborted by preflight check.\n'
+        echo(printStr)
+        return None, None
+
+    if cfg['adjacency']:
+        ignored = [name for name in ['pipeline', 'checkpoint', 'resume', 'shard'] if cfg[name]]
+        if ignored:
+            printStr = ('\nThe ' + ', '.join(ignored) + ' setting(s) are ignored when an '
+                        'adjacency table\nis written.\n')
+            echo(printStr)
+        dirname, swfiles, slfiles = gatherBOMs_from_fnames(fn, progress, cancel)
+        if not was_cancelled(cancel):
+            try:
+                export_adjacency(cfg['adjacency'], swfiles, slfiles)
+            except ImportError as e:
+                printStr = '\nError: ' + str(e) + '\n'
+                echo(printStr)
+        return None, None
+
+    pipeline = cfg['pipeline']
+    unsupported = [name for name in ['chunksize', 'sw_stdin', 'sl_stdin', 'clipboard'] if cfg[name]]
+    if pipeline and unsupported and not cfg['manifest'] and not (cfg['checkpoint'] or cfg['resume']):
+        printStr = ('\nThe pipeline setting can\'t be used along with ' + ', '.join(unsupported) +
+                    '.\nFiles will be read first and then compared instead.\n')
+        echo(printStr)
+        pipeline = 0
+
+    if cfg['treediff'] and (cfg['manifest'] or cfg['checkpoint'] or cfg['resume'] or pipeline):
+        printStr = ('\nThe treediff setting is ignored when a manifest, a checkpoint, or a pipeline\n'
+                    'is used.  No Tree Diff sheet will be created.\n')
+        echo(printStr)
+
+    # lone_sw is a dic; Keys are assy nos; Values are DataFrame objects (SW 
+    # BOMs only).  merged_sw2sl is a dic; Keys are assys nos; Values are 
+    # Dataframe objects (merged SW and SL BOMs).
+    treediff = None
+    if cfg['manifest']:
+        dirname, lone_sw, merged_sw2sl = check_manifest(cfg['manifest'], progress, cancel)
+    elif cfg['checkpoint'] or cfg['resume']:
+        dirname, lone_sw, merged_sw2sl = checkpointed_check(fn, cfg['checkpoint'],
+                                                            cfg['resume'], progress, cancel)
+    elif pipeline:
+        dirname, lone_sw, merged_sw2sl = pipeline_check(fn, pipeline, progress, cancel)
+    else:
+        dirname, swfiles, slfiles = gatherBOMs_from_fnames(fn, progress, cancel)
+        if was_cancelled(cancel):
+            return None, None
+        if cfg['treediff']:
+            with memory_stage('tree diff'):
+                treediff = tree_diff(swfiles, slfiles)
+        with memory_stage('compare'):
+            lone_sw, merged_sw2sl = collect_checked_boms(swfiles, slfiles, progress, cancel)
+    if was_cancelled(cancel):
+        return None, None
+
+    if cfg['shard']:
+        write_partial_results(dirname, lone_sw, merged_sw2sl)
+        return None, None
+
+    with memory_stage('export'):
+        results = report_results(dirname, lone_sw, merged_sw2sl, c, x, u, treediff)
+    if cfg['memprofile']:
+        echo(memory_report())
+    return results
+
+
+def apply_settings(dic={}, **kwargs):
+    ''' Put into cfg the settings for a BOM check.  (see the function
+    bomcheck for a description of dic and kwargs)'''
     # Set settings depending on 1. if input was derived from running this 
     # program from the command line (i.e. values from dic), 2. if from 
     # excecuting the bomcheck() function within a python console or called by
@@ -307,37 +893,103 @@ def bomcheck(fn, dic={}, **kwargs):
                     else kwargs.get('to_um', cfg['to_um']))
     cfg['accuracy'] = (dic.get('accuracy') if dic.get('accuracy')
                        else kwargs.get('a', cfg['accuracy']))
-    cfg['drop'] = (dic.get('drop') if dic.get('drop') 
-                   else kwargs.get('d', False))
+    cfg['drop'] = (dic.get('drop') if dic.get('drop')   # cfg['drop'] is the drop list until set True
+                   else kwargs.get('d', cfg['drop'] is True))
     cfg['skiprows_sw'] = (dic.get('skiprows_sw') if dic.get('skiprows_sw') 
                    else kwargs.get('sr_sw', cfg['skiprows_sw']))
     cfg['skiprows_sl'] = (dic.get('skiprows_sl') if dic.get('skiprows_sl') 
                    else kwargs.get('sr_sl', cfg['skiprows_sl']))
-    c = (dic.get('sheets') if dic.get('sheets') else kwargs.get('c', False))
-    u =  kwargs.get('u', 'unknown')  
-    x = kwargs.get('x', True)
-    f = kwargs.get('f', False)
+    cfg['fuzzy'] = (dic.get('fuzzy') if dic.get('fuzzy')
+                    else kwargs.get('z', cfg['fuzzy']))
+    cfg['fuzzy_distance'] = int(dic.get('fuzzy_distance') if dic.get('fuzzy_distance')
+                    else kwargs.get('zd', cfg['fuzzy_distance']))
+    cfg['chunksize'] = int(dic.get('chunksize') if dic.get('chunksize')
+                    else kwargs.get('cs', cfg['chunksize']))
+    cfg['clipboard'] = (dic.get('clipboard') if dic.get('clipboard')
+                        else kwargs.get('cb', cfg['clipboard']))
+    cfg['clipboard_timeout'] = float(dic.get('clipboard_timeout') if dic.get('clipboard_timeout')
+                        else kwargs.get('cbt', cfg['clipboard_timeout']))
+    cfg['sl_stdin'] = (dic.get('sl_stdin') if dic.get('sl_stdin')
+                       else kwargs.get('sl_stdin'))
+    cfg['sw_stdin'] = (dic.get('sw_stdin') if dic.get('sw_stdin')
+                       else kwargs.get('sw_stdin'))
+    cfg['pipeline'] = int(dic.get('pipeline') if dic.get('pipeline')
+                       else kwargs.get('p', cfg['pipeline']))
+    cfg['group'] = int(dic.get('group') if dic.get('group')
+                    else kwargs.get('g', cfg['group']))
+    cfg['autoheader'] = (False if dic.get('noautoheader')
+                         else kwargs.get('ah', cfg['autoheader']))
+    cfg['multisheet'] = (dic.get('multisheet') if dic.get('multisheet')
+                         else kwargs.get('m', cfg['multisheet']))
+    cfg['shard'] = parse_shard(dic.get('shard') if dic.get('shard')
+                               else kwargs.get('sh'))
+    cfg['manifest'] = (dic.get('manifest') if dic.get('manifest')
+                       else kwargs.get('mf'))
+    cfg['checkpoint'] = (dic.get('checkpoint') if dic.get('checkpoint')
+                         else kwargs.get('ck'))
+    cfg['resume'] = (dic.get('resume') if dic.get('resume')
+                     else kwargs.get('r', False))
+    cfg['tolerance'] = float(dic.get('tolerance') if dic.get('tolerance')
+                             else kwargs.get('tol', cfg['tolerance']))
+    cfg['tolerances'] = {str(k).strip().upper(): float(v) for k, v in
+                         kwargs.get('tols', cfg['tolerances']).items()}
+    cfg['memprofile'] = (dic.get('memprofile') if dic.get('memprofile')
+                         else kwargs.get('mp', cfg['memprofile']))
+    cfg['memory_budget'] = float(dic.get('memory_budget') if dic.get('memory_budget')
+                                 else kwargs.get('mb', cfg['memory_budget']))
+    cfg['adjacency'] = (dic.get('adjacency') if dic.get('adjacency')
+                        else kwargs.get('adj'))
+    cfg['partmaster'] = (dic.get('partmaster') if dic.get('partmaster')
+                         else kwargs.get('pm', cfg['partmaster']))
+    cfg['treediff'] = (dic.get('treediff') if dic.get('treediff')
+                       else kwargs.get('td', cfg['treediff']))
+    cfg['mismatches'] = (dic.get('mismatches') if dic.get('mismatches')
+                         else kwargs.get('mm', cfg['mismatches']))
+    cfg['context'] = int(dic.get('context') if dic.get('context')
+                         else kwargs.get('ctx', cfg['context']))
+    cfg['sniff'] = (dic.get('sniff') if dic.get('sniff')
+                    else kwargs.get('sn', cfg['sniff']))
+    cfg['preflight'] = (dic.get('preflight') if dic.get('preflight')
+                        else kwargs.get('pf', cfg['preflight']))
+    if cfg['sl_stdin'] and cfg['sw_stdin']:
+        printStr = '\nOnly one BOM, either SolidWorks or SyteLine, can be read from stdin.\n'
+        echo(printStr)
+        sys.exit(1)
 
-        
-    if isinstance(fn, str) and fn.startswith('[') and fn.endswith(']'):
-        fn = eval(fn)  # change a string to a list
-    elif isinstance(fn, str):
-        fn = [fn]
 
-    fn = get_fnames(fn, followlinks=f)  # get filenames with any extension.   
-        
-    if cfg['drop']:
-        printStr = '\ndrop = ' + str(cfg['drop']) + '\nexceptions = ' + str(cfg['exceptions']) + '\n'
-        printStrs += printStr
-        print(printStr)
+def report_results(dirname, lone_sw, merged_sw2sl, c=False, x=True, u='unknown',
+                   treediff=None):
+    ''' Report SW BOMs for which no SL BOM was found, and export the results
+    of a BOM check to an Excel file.  (see the function bomcheck for a
+    description of c, x, and u)
 
-    dirname, swfiles, slfiles = gatherBOMs_from_fnames(fn)
+    calls: filter_mismatches, concat_boms, export2excel, export_sharded
 
-    # lone_sw is a dic; Keys are assy nos; Values are DataFrame objects (SW 
-    # BOMs only).  merged_sw2sl is a dic; Keys are assys nos; Values are 
-    # Dataframe objects (merged SW and SL BOMs).
-    lone_sw, merged_sw2sl = collect_checked_boms(swfiles, slfiles)
+    Parmeters
+    =========
+
+    dirname: string
+        The directory to which the Excel file is written.
+
+    lone_sw: dictionary
+        SW BOMs for which no matching SL BOM was found.  (see the function
+        collect_checked_boms)
+
+    merged_sw2sl: dictionary
+        Merged SW/SL BOMs.
+
+    treediff: Pandas DataFrame or None
+        If not None, exported to a sheet named Tree Diff.  (see the function
+        tree_diff)  Default: None
 
+    Returns
+    =======
+
+    out: tuple
+        If c is False, a tuple of two DataFrames: all the SW BOMs for which
+        no SL BOM was found, concatenated, and all the merged SW/SL BOMs,
+        concatenated.  Either may be None.  If c is True, None.
+    '''
     title_dfsw = []                # Create a list of tuples: [(title, swbom)... ]
     for k, v in lone_sw.items():   # where "title" is is the title of the BOM,
         title_dfsw.append((k, v))  # usually the part no. of the BOM.
@@ -349,26 +1001,35 @@ def bomcheck(fn, dic={}, **kwargs):
     if title_dfsw:
         printStr = '\nNo matching SyteLine BOMs found for these SolidWorks files:\n'
         printStr += '\n'.join(list(map(lambda x: '    ' + x[0], title_dfsw))) + '\n'
-        printStrs += printStr
-        print(printStr)
+        echo(printStr)
+
+    summary = []   # sheets added after those of the BOMs
+    if cfg['mismatches']:
+        title_dfmerged, dfsummary = filter_mismatches(title_dfmerged, cfg['context'])
+        summary = [('Summary', dfsummary)]
+    if treediff is not None:
+        summary.append(('Tree Diff', treediff))
+    if cfg['partmaster'] and run_context().partmaster is not None:
+        summary.append(('SL Descriptions', run_context().partmaster_inconsistent))
 
     if c == False:                 # concat_boms is a bomcheck function
     	title_dfsw, title_dfmerged = concat_boms(title_dfsw, title_dfmerged)
 
     if x:
         try:
-            if title_dfsw or title_dfmerged:
-                export2excel(dirname, 'bomcheck', title_dfsw + title_dfmerged, u)
+            if (title_dfsw or title_dfmerged) and c and cfg['group']:
+                export_sharded(dirname, 'bomcheck', title_dfsw + title_dfmerged + summary,
+                               u, cfg['group'])
+            elif title_dfsw or title_dfmerged:
+                export2excel(dirname, 'bomcheck', title_dfsw + title_dfmerged + summary, u)
             else:
                 printStr = ('\nNo SolidWorks files found to process.  (Lone SyteLine\n' +
                             'BOMs will be ignored.)  Make sure file names end with\n' +
                             '_sw.xlsx, _sw.csv, _sl.xlsx, or _sl.csv.\n')
-                printStrs += printStr
-                print(printStr)
+                echo(printStr)
         except PermissionError:
             printStr = '\nError: unable to write to bomcheck.xlsx\n'
-            printStrs += printStr
-            print(printStr)
+            echo(printStr)
 
     if c == False:
         if title_dfsw and title_dfmerged:
@@ -381,6 +1042,149 @@ def bomcheck(fn, dic={}, **kwargs):
             return None, None
 
 
+class BomCheckSession:
+    ''' Hold the BOMs read from files so that a BOM check can be redone with
+    different settings without the files being read again.  A BOM check is
+    done in three stages, and each setting affects one stage:
+
+    - read: files are read and their BOMs deconstructed (see the function
+      gatherBOMs_from_fnames).  Affected by READ_SETTINGS.
+    - compare: SW BOMs are converted to SL format and compared to SL BOMs
+      (see the function collect_checked_boms).  Affected by COMPARE_SETTINGS.
+    - export: results are reported and exported to Excel (see the function
+      report_results).  Done every time.
+
+    When the run method is called, a stage is redone only if a setting that
+    affects it, or an earlier stage, changed.  The BOMs held are not altered
+    by later stages.
+
+    The pipeline, manifest, checkpoint, and shard options of the bomcheck
+    function are not supported by a session.
+
+    Parmeters
+    =========
+
+    fn: string or list
+        Same as fn of the bomcheck function.
+
+    f: bool
+        Same as f of the bomcheck function.  Default: False
+
+    Examples
+    ========
+
+    >>> s = BomCheckSession("C:/folder")
+
+    >>> s.run(d=True)       # files read, BOMs compared, results exported
+
+    >>> s.run(d=False, a=3) # BOMs compared again; files not read again
+
+    >>> s.run(c=True)       # results exported only
+
+    >>> s.reload()          # files will be read again at the next run
+
+    >>> s.ctx.printStrs     # messages printed by the session's BOM checks
+    '''
+    READ_SETTINGS = ['skiprows_sw', 'skiprows_sl', 'autoheader', 'header_scan_rows',
+                     'multisheet', 'chunksize', 'sniff', 'col', 'clipboard',
+                     'sl_stdin', 'sw_stdin']
+    COMPARE_SETTINGS = ['drop', 'exceptions', 'discard_length', 'from_um', 'to_um',
+                        'accuracy', 'tolerance', 'tolerances', 'fuzzy', 'fuzzy_distance',
+                        'partmaster']
+
+    def __init__(self, fn, f=False):
+        if isinstance(fn, str) and fn.startswith('[') and fn.endswith(']'):
+            fn = eval(fn)  # change a string to a list
+        elif isinstance(fn, str):
+            fn = [fn]
+        self.fn = fn
+        self.followlinks = f
+        self.ctx = RunContext()
+        self.reload()
+
+    def reload(self):
+        ''' Forget the BOMs held so that files are read again at the next
+        run; e.g. after files have been edited.'''
+        self.read_key = self.compare_key = None
+        self.dirname, self.swfiles, self.slfiles = '.', {}, {}
+        self.lone_sw, self.merged_sw2sl = {}, {}
+
+    def run(self, **kwargs):
+        ''' Do a BOM check.  kwargs are those of the bomcheck function.
+        Returns the same as the bomcheck function.
+
+        calls: apply_settings, gatherBOMs_from_fnames, collect_checked_boms,
+        report_results
+        '''
+        return self.ctx.run(self._run, **kwargs)
+
+    @ends_memory_monitoring
+    def _run(self, **kwargs):
+        apply_settings({}, **kwargs)
+        progress = kwargs.get('progress')
+        cancel = kwargs.get('cancel', lambda: False)
+        read_key = repr([cfg[k] for k in self.READ_SETTINGS])
+        compare_key = read_key + repr([cfg[k] for k in self.COMPARE_SETTINGS])
+        if read_key != self.read_key:
+            self.compare_key = None
+            self.dirname, self.swfiles, self.slfiles = gatherBOMs_from_fnames(
+                get_fnames(self.fn, followlinks=self.followlinks), progress, cancel)
+            if was_cancelled(cancel):
+                return None, None
+            self.read_key = read_key
+        if cfg['drop']:
+            printStr = '\ndrop = ' + str(cfg['drop']) + '\nexceptions = ' + str(cfg['exceptions']) + '\n'
+            echo(printStr)
+        if compare_key != self.compare_key:
+            self.lone_sw, self.merged_sw2sl = collect_checked_boms(
+                self.swfiles, self.slfiles, progress, cancel)
+            if was_cancelled(cancel):
+                return None, None
+            self.compare_key = compare_key
+        return report_results(self.dirname,
+                              {k: v.copy() for k, v in self.lone_sw.items()},
+                              {k: v.copy() for k, v in self.merged_sw2sl.items()},
+                              kwargs.get('c', False), kwargs.get('x', True),
+                              kwargs.get('u', 'unknown'),
+                              tree_diff(self.swfiles, self.slfiles) if cfg['treediff'] else None)
+
+
+def parse_shard(shard):
+    ''' Convert a string like "2/4" to the tuple (2, 4).  None is returned if
+    shard is None or empty.  The program exits if shard is malformed.'''
+    if not shard:
+        return None
+    try:
+        i, n = (int(x) for x in str(shard).split('/'))
+        if not 1 <= i <= n:
+            raise ValueError
+        return (i, n)
+    except ValueError:
+        printStr = '\nInvalid shard: ' + str(shard) + '.  It must look like i/N, where 1 <= i <= N.\n'
+        echo(printStr)
+        sys.exit(1)
+
+
+def in_shard(key, shard):
+    ''' Return True if the assembly with pn key belongs to shard, a tuple
+    (i, N).  Keys are assigned to shards by a CRC32 hash of the key, so the
+    assignment is the same on every computer and every run.'''
+    if not shard:
+        return True
+    i, n = shard
+    return zlib.crc32(key.upper().encode('utf-8')) % n == i - 1
+
+
+def was_cancelled(cancel):
+    ''' Return True, and report that the BOM check was cancelled, if
+    cancel() returns True.  (see the "cancel" argument of bomcheck)'''
+    if cancel and cancel():
+        printStr = '\nBOM check cancelled.\n'
+        echo(printStr)
+        return True
+    return False
+
+
 def get_fnames(fn, followlinks=False):
     ''' Interpret fn to get a list of filenames based on fn's value.  
     
@@ -392,7 +1196,9 @@ def get_fnames(fn, followlinks=False):
         "['filename1', 'filename2', 'dirname1' ...]". Example 2, list:
         ["filename1", "filename2", "dirname1", "dirname2"].  When a a directory
         name is given, filenames are gathered from that directory and from 
-        subdirectories thereof.
+        subdirectories thereof.  A zip archive is treated like a directory;
+        the names of the files within it are like "C:/dirname/bom.zip/
+        085952_sw.xlsx".  (see the function zip_member)
     followlinks: Boolean, optional
         If True, follow symbolic links. If a link is to a direcory, then
         filenames are gathered from that directory and from subdirectories
@@ -426,10 +1232,98 @@ def get_fnames(fn, followlinks=False):
         else:
             _fn2.append(f) 
             
-    return _fn2
-
-
-def make_csv_file_stable(filename):
+    _fn3 = []    # with zip archives replaced by the files within them
+    for f in _fn2:
+        if f.lower().endswith('.zip') and zipfile.is_zipfile(f):
+            with zipfile.ZipFile(f) as zf:
+                _fn3 += [os.path.join(f, m) for m in zf.namelist() if not m.endswith('/')]
+        else:
+            _fn3.append(f)
+    return _fn3
+
+
+def zip_member(filename):
+    ''' If filename is that of a file within a zip archive, e.g.
+    "C:/dirname/bom.zip/subdir/085952_sw.xlsx", return a tuple of the
+    archive's name and the member's name, e.g. ("C:/dirname/bom.zip",
+    "subdir/085952_sw.xlsx").  Otherwise return None.'''
+    parts = re.split(r'(?<=\.zip)[/\\]', filename, maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) == 2 and os.path.isfile(parts[0]):
+        return parts[0], parts[1].replace('\\', '/')
+    return None
+
+
+def _read_zip_member(archive, member):
+    ''' Return the decompressed contents of a member of a zip archive.'''
+    with zipfile.ZipFile(archive) as zf:
+        return zf.read(member)
+
+
+def holds_zip_member(func):
+    ''' Decorator for a function, func(source, k, v, ...), that opens the
+    BOM file named v, often more than once; e.g. to find its header row and
+    then to read it.  While func runs, if v is within a zip archive, v is
+    decompressed only once and its contents held (see the function
+    bom_source).  They are let go when func returns, so each thread holds
+    the contents of no more than the one file it is reading.'''
+    @functools.wraps(func)
+    def wrapper(source, k, v, *args, **kwargs):
+        token = _held_zip_member.set([v, None])   # [filename, contents]
+        try:
+            return func(source, k, v, *args, **kwargs)
+        finally:
+            _held_zip_member.reset(token)
+    return wrapper
+
+_held_zip_member = contextvars.ContextVar('bomcheck_held_zip_member', default=None)
+
+
+def bom_source(filename):
+    ''' Return what pandas or openpyxl should read the file named filename
+    from: filename itself, or, if the file is within a zip archive, an
+    in-memory file (io.BytesIO) of its contents.  Nothing is extracted to
+    disk.  (see also the function holds_zip_member)'''
+    zm = zip_member(filename)
+    if zm is None:
+        return filename
+    held = _held_zip_member.get()
+    if held is None or held[0] != filename:
+        return io.BytesIO(_read_zip_member(zm[0], zm[1]))
+    if held[1] is None:
+        held[1] = _read_zip_member(zm[0], zm[1])
+    return io.BytesIO(held[1])
+
+
+def open_bom_file(filename, mode='r', encoding=None):
+    ''' Like open(filename, mode, encoding=encoding), but filename can also
+    be that of a file within a zip archive.  (see the function zip_member)'''
+    source = bom_source(filename)
+    if isinstance(source, str):
+        return open(source, mode, encoding=encoding)
+    return source if 'b' in mode else io.TextIOWrapper(source, encoding=encoding)
+
+
+def bom_file_stat(filename):
+    ''' Return (size, modification time) of the file named filename.  For a
+    file within a zip archive these are its uncompressed size, and the
+    archive's modification time plus the file's CRC.'''
+    zm = zip_member(filename)
+    if zm is None:
+        st = os.stat(filename)
+        return (st.st_size, st.st_mtime_ns)
+    with zipfile.ZipFile(zm[0]) as zf:
+        info = zf.getinfo(zm[1])
+    return (info.file_size, (os.stat(zm[0]).st_mtime_ns, info.CRC))
+
+
+def outer_path(filename):
+    ''' Return filename, or, if the file is within a zip archive, the name
+    of the archive.'''
+    zm = zip_member(filename)
+    return zm[0] if zm else filename
+
+
+def make_csv_file_stable(filename, hdr=1):
     ''' Except for any commas in a parts DESCRIPTION, replace all commas
     in a csv file with a $ character.  Commas will sometimes exist in a
     DESCRIPTION field, e.g, "TANK, 60GAL".  But commas are intended to be field
@@ -443,6 +1337,9 @@ def make_csv_file_stable(filename):
     filename: string
         Name of SolidWorks csv file to process.
 
+    hdr: int
+        Index of the line that contains the column headings.  Default: 1
+
     Returns
     =======
 
@@ -451,13 +1348,20 @@ def make_csv_file_stable(filename):
         line are changed to dollar signs except for any commas in the
         DESCRIPTION field.
     '''
-    with open(filename, encoding="ISO-8859-1") as f:
+    with open_bom_file(filename, encoding="ISO-8859-1") as f:
         data1 = f.readlines()
-    # n1 = number of commas in 2nd line of filename (i.e. where column header
+    return make_csv_lines_stable(data1, hdr)
+
+
+def make_csv_lines_stable(data1, hdr=1):
+    ''' Do for the lines of a SolidWorks csv file, data1, what the function
+    make_csv_file_stable does for a file.  Lines are as returned by readlines,
+    i.e. each ends with a newline character.'''
+    # n1 = number of commas in the hdr line of filename (i.e. where column header
     #      names located).  This is the no. of commas that should be in each row.
-    n1 = data1[1].count(',')
-    n2 = data1[1].upper().find('DESCRIPTION')  # locaton of the word DESCRIPTION within the row.
-    n3 = data1[1][:n2].count(',')  # number of commas before the word DESCRIPTION
+    n1 = data1[hdr].count(',')
+    n2 = data1[hdr].upper().find('DESCRIPTION')  # locaton of the word DESCRIPTION within the row.
+    n3 = data1[hdr][:n2].count(',')  # number of commas before the word DESCRIPTION
     data2 = list(map(lambda x: x.replace(',', '$') , data1)) # replace ALL commas with $
     data = []
     for row in data2:
@@ -473,7 +1377,7 @@ def make_csv_file_stable(filename):
     return data
 
 
-def gatherBOMs_from_fnames(filename):
+def gatherBOMs_from_fnames(filename, progress=None, cancel=None):
     ''' Gather all SolidWorks and SyteLine BOMs derived from "filename".
     "filename" can be a string containing wildcards, e.g. 6890-085555-*, which
     allows the capture of multiple files; or "filename" can be a list of such
@@ -488,7 +1392,24 @@ def gatherBOMs_from_fnames(filename):
     subassembly BOMs will be extracted from that BOM and be added to the 
     dictionaries.
 
-    calls: make_csv_file_stable, deconstructMultilevelBOM, test_for_missing_columns
+    If cfg['sw_stdin'] or cfg['sl_stdin'] is set, a BOM piped to stdin is
+    also read.  If cfg['clipboard'] is True, a SL BOM is also read from the
+    clipboard.
+
+    If cfg['chunksize'] is nonzero, SL files are instead read a chunk at a
+    time, one top level assembly at a time (see the function
+    read_multilevel_bom_in_chunks), and only those assemblies and
+    subassemblies for which a SW BOM exists are kept.
+
+    Files within zip archives (see the function get_fnames) are read from
+    the archives into memory, not extracted, and several of them are read
+    at once: SW files first, then SL files.  The memory recorded for each
+    of them (see the function memory_stage) thus includes that of the reads
+    done at the same time.  If cfg['memprofile'] is True, they are instead
+    read one at a time, so that what is recorded for each is its own.
+
+    calls: split_sw_sl_fnames, read_bom_file, deconstructMultilevelBOM,
+    test_for_missing_columns, read_bom_from_stdin, read_clipboard_with_timeout
 
     Parmeters
     =========
@@ -496,6 +1417,12 @@ def gatherBOMs_from_fnames(filename):
     filename: list
         List of filenames to be analyzed.
 
+    progress: function or None
+        Called before each file is read.  (see the function bomcheck)
+
+    cancel: function or None
+        If cancel() returns True, no more files are read.
+
     Returns
     =======
 
@@ -510,10 +1437,317 @@ def gatherBOMs_from_fnames(filename):
         from 085953_sw.xlsx), or derived from subassembly part numbers of a
         file containing multilevel BOM.
     '''
+    dirname, swfilesdic, slfilesdic = split_sw_sl_fnames(filename)
+    n = len(swfilesdic) + len(slfilesdic)
+    jobs = ([('sw', k, v) for k, v in swfilesdic.items()] +
+            [('sl', k, v) for k, v in slfilesdic.items()])
+    swdfsdic = {}  # for collecting SW BOMs to a dic
+    sldfsdic = {}  # for collecting SL BOMs to a dic
+
+    def check_memory_budget(source, k, v):
+        if (source == 'sl' and cfg['memory_budget'] and not cfg['chunksize']
+                and exceeds_memory_budget(v)):
+            printStr = ('\nReading ' + v + ' whole would exceed the memory budget\n' +
+                        'of ' + str(cfg['memory_budget']) + ' MB.  SL files are now read in chunks.\n')
+            echo(printStr)
+            cfg['chunksize'] = 50000   # until all files are read
+
+    def read_job(source, k, v):
+        with memory_stage('read ' + os.path.basename(v)):
+            return read_bom_file(source, k, v, keep=swdfsdic if source == 'sl' else None)
+
+    ctx = run_context()
+    workers = 1 if cfg['memprofile'] else min(8, os.cpu_count() or 1)
+    futures = {}   # zip archive members being read ahead, keyed by job no.
+    chunksize = cfg['chunksize']   # restored after reading, see check_memory_budget
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        for i, (source, k, v) in enumerate(jobs):  # SW files first; SL files use swdfsdic
+            if cancel and cancel():
+                for future in futures.values():
+                    future.cancel()
+                return dirname, swdfsdic, sldfsdic
+            if progress:
+                progress('read', i, n, v)
+            # Keep up to workers zip members being read.  SL files aren't
+            # read ahead until all SW BOMs are known.
+            end = min(i + workers, len(jobs) if source == 'sl' else len(swfilesdic))
+            for j in range(i, end if workers > 1 else i):
+                if j not in futures and zip_member(jobs[j][2]):
+                    check_memory_budget(*jobs[j])   # against the RSS of reads so far
+                    futures[j] = executor.submit(ctx.run, read_job, *jobs[j])
+            if i in futures:
+                dic = futures.pop(i).result()
+            else:
+                check_memory_budget(source, k, v)
+                dic = read_job(source, k, v)
+            (swdfsdic if source == 'sw' else sldfsdic).update(dic)
+    finally:
+        executor.shutdown()
+        cfg['chunksize'] = chunksize
+    if progress:
+        progress('read', n, n, '')
+    if cfg['sw_stdin']:
+        df = read_bom_from_stdin('sw')
+        if df is not None and not test_for_missing_columns('sw', df, cfg['sw_stdin']):
+            swdfsdic.update(deconstructMultilevelBOM(df, 'sw', cfg['sw_stdin']))
+            if dirname == '.':
+                dirname = os.getcwd()
+    if cfg['sl_stdin']:
+        df = read_bom_from_stdin('sl')
+        if df is not None and not test_for_missing_columns('sl', df, 'BOMfromStdin'):
+            sldfsdic.update(deconstructMultilevelBOM(df, 'sl', cfg['sl_stdin']))
+    if cfg['clipboard']:
+        df = read_clipboard_with_timeout(cfg['clipboard_timeout'])
+        if df is not None and not test_for_missing_columns('sl', df, 'BOMfromClipboard', printerror=False):
+            sldfsdic.update(deconstructMultilevelBOM(df, 'sl', 'TOPLEVEL'))
+    return dirname, share_identical_boms(swdfsdic), share_identical_boms(sldfsdic)
+
+
+def rss_mb():
+    ''' Return the resident set size (RSS), i.e. the physical memory used,
+    of this process in MB, or None if it can't be determined.  psutil is
+    used if installed, otherwise /proc (Linux only).'''
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def vms_mb():
+    ''' Return the virtual memory size, i.e. the address space used, of this
+    process in MB, or None if it can't be determined.'''
+    try:
+        import psutil
+        return psutil.Process().memory_info().vms / 2**20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def start_memory_budget(ctx):
+    ''' Enforce cfg['memory_budget'] from now until the BOM check of the run
+    context ctx ends (see the function stop_memory_budget), not only at the
+    end of each stage (see the function memory_stage).
+
+    Where the resource module can limit the address space of the process
+    (not MS Windows), the limit is set to the current address space plus the
+    memory left in the budget, i.e. the budget less the RSS.  Then an
+    allocation that would exceed the budget raises a MemoryError in the
+    thread that made it, even in the middle of a stage, rather than the
+    process being killed by the operating system.  The limit is for the
+    whole process, so if BOM checks with budgets are done at the same time,
+    the limit set by the first one stays until all of them are done.
+
+    Elsewhere a watchdog thread samples the RSS ten times a second and the
+    highest RSS seen is checked against the budget at the end of each
+    stage.'''
+    rss, vms = rss_mb(), vms_mb()
+    try:
+        import resource
+        rlimit = resource.RLIMIT_AS
+    except (ImportError, AttributeError):
+        rlimit = None
+    if rlimit is not None and rss is not None and vms is not None:
+        with _budget_lock:
+            if _budget['runs'] == 0:
+                soft, hard = resource.getrlimit(rlimit)
+                limit = int((vms + max(cfg['memory_budget'] - rss, 0)) * 2**20)
+                if hard != resource.RLIM_INFINITY:
+                    limit = min(limit, hard)
+                resource.setrlimit(rlimit, (limit, hard))
+                _budget['soft'] = soft
+            _budget['runs'] += 1
+        ctx.budget = {'rlimit': True}
+        return
+    stop = threading.Event()
+    ctx.budget = {'rlimit': False, 'stop': stop, 'peak': None}
+
+    def watch():
+        while not stop.wait(0.1):
+            rss = rss_mb()
+            if rss is not None and (ctx.budget['peak'] is None or rss > ctx.budget['peak']):
+                ctx.budget['peak'] = rss
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def stop_memory_budget(ctx):
+    ''' Undo what the function start_memory_budget did for the run context
+    ctx, if anything.'''
+    if ctx.budget is None:
+        return
+    if ctx.budget['rlimit']:
+        import resource
+        with _budget_lock:
+            _budget['runs'] -= 1
+            if _budget['runs'] == 0:
+                resource.setrlimit(resource.RLIMIT_AS,
+                                   (_budget['soft'], resource.getrlimit(resource.RLIMIT_AS)[1]))
+    else:
+        ctx.budget['stop'].set()
+    ctx.budget = None
+
+_budget = {'runs': 0, 'soft': None}   # BOM checks limiting the address space
+_budget_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    ''' Return the peak RSS of this process so far in MB, or None if it
+    can't be determined (MS Windows).'''
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10  # bytes or KB
+
+
+def exceeds_memory_budget(filename):
+    ''' Return True if reading the file named filename into memory whole
+    would probably exceed cfg['memory_budget'].  A DataFrame takes roughly
+    MEMORY_PER_FILE_BYTE bytes of memory for each byte of the file.'''
+    rss = rss_mb()
+    if rss is None:
+        return False
+    return rss + bom_file_stat(filename)[0] * MEMORY_PER_FILE_BYTE / 2**20 > cfg['memory_budget']
+
+MEMORY_PER_FILE_BYTE = 10
+
+
+@contextlib.contextmanager
+def memory_stage(name):
+    ''' A context manager that records the memory used by a stage of a BOM
+    check, e.g. "compare", or the reading of a file, e.g. "read
+    085952_sw.xlsx".  Nothing is done unless cfg['memprofile'] or
+    cfg['memory_budget'] is set.
+
+    Recorded in the memrecords of the run context (see the class
+    RunContext) are the RSS at the end of the stage, the change in RSS
+    during the stage, and the peak RSS of the process so far.  If
+    cfg['memprofile'] is True, tracemalloc is also used to record the peak
+    memory allocated by Python during the stage and the three lines of code
+    that allocated the most.  (tracemalloc slows the BOM check down.)
+
+    If cfg['memory_budget'] is nonzero, it is enforced during the stage
+    (see the function start_memory_budget), and if it is exceeded a report
+    (see the function memory_report) is printed and a MemoryError is
+    raised.  Thus the BOM check stops with a report rather than the process
+    being killed by the operating system.
+
+    >>> with memory_stage('compare'):
+    ...     lone_sw, merged_sw2sl = collect_checked_boms(swfiles, slfiles)
+    '''
+    if not cfg['memprofile'] and not cfg['memory_budget']:
+        yield
+        return
+    snapshot = None
+    if cfg['memprofile']:
+        ctx = run_context()
+        with _tracing_lock:
+            if not ctx.tracing:   # the first stage of this BOM check
+                ctx.tracing = True
+                _tracing['runs'] += 1
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing['started'] = True
+        tracemalloc.reset_peak()
+        snapshot = tracemalloc.take_snapshot()
+    ctx = run_context()
+    if cfg['memory_budget'] and ctx.budget is None:
+        start_memory_budget(ctx)
+    rss0 = rss_mb()
+    try:
+        yield
+    except MemoryError:   # an allocation beyond the address space limit
+        if ctx.budget is not None and not ctx.budget.get('reported'):
+            ctx.budget['reported'] = True
+            printStr = ('\nMemory budget of ' + str(cfg['memory_budget']) + ' MB exceeded ' +
+                        'during stage "' + name + '".\nBOM check stopped.\n' + memory_report())
+            echo(printStr)
+        raise
+    rss = rss_mb()
+    record = {'stage': name, 'rss': rss, 'change': rss - rss0 if rss and rss0 else None,
+              'peak_rss': peak_rss_mb(), 'traced_peak': None, 'top': []}
+    if snapshot is not None:
+        record['traced_peak'] = tracemalloc.get_traced_memory()[1] / 2**20
+        notracemalloc = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = tracemalloc.take_snapshot().filter_traces(notracemalloc).compare_to(
+            snapshot.filter_traces(notracemalloc), 'lineno')
+        record['top'] = [str(stat) for stat in stats[:3]]
+    ctx.memrecords.append(record)
+    peak = ctx.budget.get('peak') if ctx.budget is not None else None
+    peak = max(rss, peak) if rss and peak else rss   # highest seen by the watchdog
+    if cfg['memory_budget'] and peak and peak > cfg['memory_budget']:
+        if ctx.budget is not None:
+            ctx.budget['reported'] = True
+        printStr = ('\nMemory budget of ' + str(cfg['memory_budget']) + ' MB exceeded ' +
+                    'at stage "' + name + '" (RSS ' + str(round(peak)) + ' MB).\n' +
+                    'BOM check stopped.\n' + memory_report())
+        echo(printStr)
+        raise MemoryError('memory budget exceeded at stage "' + name + '"')
+
+
+def memory_report():
+    ''' Return, as a string, a table of the memory used by each stage of
+    the BOM check.  (see the function memory_stage)'''
+    def mb(x):
+        return '' if x is None else str(round(x, 1))
+    lines = ['\nMemory used (MB):\n',
+             '    {:<40}{:>10}{:>10}{:>10}{:>12}'.format('stage', 'RSS', 'change',
+                                                          'peak RSS', 'traced peak')]
+    for r in run_context().memrecords:
+        lines.append('    {:<40}{:>10}{:>10}{:>10}{:>12}'.format(
+            r['stage'][:39], mb(r['rss']), mb(r['change']), mb(r['peak_rss']),
+            mb(r['traced_peak'])))
+        lines += ['        ' + t for t in r['top']]
+    return '\n'.join(lines) + '\n'
+
+
+def split_sw_sl_fnames(filename):
+    ''' From a list of filenames pick out those that end with _sw.xlsx,
+    _sw.csv, _sl.xlsx, or _sl.csv (or similar), and put them into two
+    dictionaries: one for SolidWorks files and one for SyteLine files.  Keys
+    of the dictionaries are the filenames, excluding path, up until the last
+    underscore character; e.g. 085952 from C:/dir/085952_sw.xlsx.
+
+    If cfg['shard'] is set, only SW files whose keys belong to the shard (see
+    the function in_shard) are kept.  All SL files are kept because any of
+    them may contain a BOM needed by the shard.
+
+    If cfg['sniff'] is True, other csv, txt, xlsx, and xls files are
+    classified by their contents (see the function sniff_bom_file).  Files
+    so classified never replace files of the same key named _sw or _sl.
+
+    calls: in_shard, sniff_bom_file
+
+    Parmeters
+    =========
+
+    filename: list
+        List of filenames.
+
+    Returns
+    =======
+
+    out: tuple
+        The output tuple contains three items: 1. The directory of the first
+        _sw file found (the directory to which bomcheck.xlsx is written).
+        2. Dictionary of SW filenames.  3. Dictionary of SL filenames.
+    '''
     dirname = '.'  # to this will assign the name of 1st directory a _sw is found in 
-    global printStrs
     swfilesdic = {}
     slfilesdic = {}
+    unnamed = []   # files to be classified by content if cfg['sniff'] is True
     for f in filename:  # from filename extract all _sw & _sl files and put into swfilesdic & slfilesdic
         i = f.rfind('_')
         if f[i:i+4].lower() == '_sw.' or f[i:i+4].lower() == '_sl.':
@@ -521,73 +1755,359 @@ def gatherBOMs_from_fnames(filename):
             k = fname.rfind('_')
             fntrunc = fname[:k]  # Name of the sw file, excluding path, and excluding _sw.xlsx
             if f[i:i+4].lower() == '_sw.' and '~' not in fname: # Ignore names like ~$085637_sw.xlsx
+                if not in_shard(fntrunc, cfg['shard']):
+                    continue  # another computer will check this one
+                if fntrunc in swfilesdic:
+                    printStr = ('\nMore than one SW file was found for ' + fntrunc + '.  ' + f +
+                                '\nis used instead of ' + swfilesdic[fntrunc] + '.\n')
+                    echo(printStr)
                 swfilesdic.update({fntrunc: f})
                 if dirname == '.':
-                    dirname = os.path.dirname(os.path.abspath(f)) # use 1st dir where a _sw file is found to put bomcheck.xlsx
+                    dirname = os.path.dirname(os.path.abspath(outer_path(f))) # use 1st dir where a _sw file is found to put bomcheck.xlsx
             elif f[i:i+4].lower() == '_sl.' and '~' not in fname:
+                if fntrunc in slfilesdic:
+                    printStr = ('\nMore than one SL file was found for ' + fntrunc + '.  ' + f +
+                                '\nis used instead of ' + slfilesdic[fntrunc] + '.\n')
+                    echo(printStr)
                 slfilesdic.update({fntrunc: f})    
-    swdfsdic = {}  # for collecting SW BOMs to a dic
-    for k, v in swfilesdic.items():
+        elif (cfg['sniff'] and '~' not in os.path.basename(f) and
+              os.path.splitext(f)[1].lower() in ['.csv', '.txt', '.xlsx', '.xls']):
+            unnamed.append(f)
+    if unnamed:   # classify files by their contents
+        ctx = run_context()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(unnamed))) as executor:
+            sniffed = list(executor.map(lambda f: ctx.run(sniff_bom_file, f), unnamed))
+        printStr = ''
+        for f, (source, key) in zip(unnamed, sniffed):
+            if source == 'sw' and key not in swfilesdic and in_shard(key, cfg['shard']):
+                swfilesdic[key] = f
+                if dirname == '.':
+                    dirname = os.path.dirname(os.path.abspath(outer_path(f)))
+            elif source == 'sl' and key not in slfilesdic:
+                slfilesdic[key] = f
+            else:
+                continue
+            printStr += '    ' + f + ': ' + source.upper() + ' BOM of ' + key + '\n'
+        if printStr:
+            printStr = '\nFiles classified by their contents:\n\n' + printStr
+            echo(printStr)
+    if os.path.islink(dirname):
+        dirname = os.readlink(dirname)
+    return dirname, swfilesdic, slfilesdic
+
+
+def sniff_bom_file(filename):
+    ''' Determine from its contents whether a file is a SolidWorks or a
+    SyteLine BOM, and find the pn of its assembly.  Only the first
+    cfg['header_scan_rows'] + 1 rows of the file are read.  The file is a
+    SW BOM if a header row (see the function find_header_row) containing
+    ITEM NO. is found, and a SL BOM if one containing UM is found.  (See
+    cfg['col'] for alternative names of these columns.)
+
+    The assy pn is, in order of preference:
+
+    1. The filename, excluding path and extension, if it looks like a pn;
+       e.g. 085952 from C:/dir/085952.xlsx.
+    2. For a SL BOM, the pn of the first row whose Level is 0.
+    3. The first cell that looks like a pn in the rows above the header row.
+       (A SW BOM's title row usually contains its pn.)
+    4. The filename, excluding path and extension.
+
+    calls: read_head_rows, find_header_row, clean_col_names
+
+    Parmeters
+    =========
+
+    filename: string
+        Name of a csv, txt, xlsx, or xls file.
+
+    Returns
+    =======
+
+    out: tuple
+        (source, pn), where source is "sw" or "sl".  If the file is
+        neither, or can't be read, (None, None).
+    '''
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    nrows = cfg['header_scan_rows'] + 1
+    found = None
+    # a SL csv file's encoding and delimiter are sniffed; a SW csv file's aren't
+    for encoding_of in (['sl', 'sw'] if os.path.splitext(filename)[1].lower()
+                        in ['.csv', '.txt'] else ['sw']):
         try:
-            _, file_extension = os.path.splitext(v)
+            rows = read_head_rows(filename, encoding_of, nrows)
+        except Exception:
+            continue
+        for source in ['sw', 'sl']:
+            hdr = find_header_row(rows[:-1], source)
+            if hdr is not None:
+                found = (source, hdr, rows)
+                break
+        if found:
+            break
+    if not found:
+        return None, None
+    source, hdr, rows = found
+    if _pn_pattern.match(stem):
+        return source, stem
+    header = clean_col_names(rows[hdr])
+    lvl = next((header.index(c) for c in cfg['col']['level_sl'] if c in header), None)
+    pn = next((header.index(c) for c in cfg['col']['part_num'] if c in header), None)
+    if source == 'sl' and lvl is not None and pn is not None:
+        for row in rows[hdr+1:]:
+            if len(row) > max(lvl, pn) and str(row[lvl]).strip() in ['0', '0.0']:
+                return source, str(row[pn]).strip().strip('"')
+    for row in rows[:hdr]:
+        for cell in row:
+            if cell is not None and _pn_pattern.match(str(cell).strip().strip('"')):
+                return source, str(cell).strip().strip('"')
+    return source, stem
+
+# A part number: starts with a digit and contains only letters, digits, and
+# dashes; e.g. 085952, 6890-103, 3086-ABC.  At least 4 characters long.
+_pn_pattern = re.compile(r'^\d[0-9A-Za-z]*(?:-[0-9A-Za-z]+)*$(?<=.{4})')
+
+
+@holds_zip_member
+def read_bom_file(source, k, v, keep=None):
+    ''' Read one SolidWorks or SyteLine BOM file and deconstruct it into its
+    assembly and subassembly BOMs.  If the file can't be processed, a message
+    is printed and an empty dictionary is returned.
+
+    calls: make_csv_file_stable, deconstructMultilevelBOM, test_for_missing_columns,
+    read_multilevel_bom_in_chunks, header_row_of_text_file, sniff_text_format,
+    read_excel_with_header_detection, read_workbook_sheets
+
+    Parmeters
+    =========
+
+    source: string
+        "sw" or "sl"
+
+    k: string
+        Assembly pn derived from the filename; e.g. 085952 from 085952_sw.xlsx
+
+    v: string
+        Name of the file.
+
+    keep: container or None
+        Only used when cfg['chunksize'] is nonzero and source is "sl".  Only
+        assemblies whose pns are in keep are retained.  If None, all are
+        retained.  Default: None
+
+    Returns
+    =======
+
+    out: dictionary
+        Keys are assy pns, values are DataFrames.  (see the function
+        deconstructMultilevelBOM)
+    '''
+    try:
+        _, file_extension = os.path.splitext(v)
+        if source == 'sw':
             if file_extension.lower() == '.csv' or file_extension.lower() == '.txt':
-                data = make_csv_file_stable(v)
+                hdr = header_row_of_text_file(v, 'sw', 'ISO-8859-1', ',')
+                data = make_csv_file_stable(v, hdr)
                 temp = tempfile.TemporaryFile(mode='w+t')
                 for d in data:
                     temp.write(d)
                 temp.seek(0)
-                df = pd.read_csv(temp, na_values=[' '], skiprows=cfg['skiprows_sw'], sep='$',
+                df = pd.read_csv(temp, na_values=[' '], skiprows=hdr, sep='$',
                                  encoding='iso8859_1', engine='python',
                                  dtype = dict.fromkeys(cfg['col']['itm_sw'], 'str'))
                 temp.close()
+            elif cfg['multisheet'] and file_extension.lower() in ['.xlsx', '.xls']:
+                return read_workbook_sheets(v, 'sw', k)
             elif file_extension.lower() == '.xlsx' or file_extension.lower() == '.xls':
-                df = pd.read_excel(v, na_values=[' '], skiprows=cfg['skiprows_sw'])
-                colnames = []
-                for colname in df.columns:  # rid colname of '\n' char if exists
-                    colnames.append(colname.replace('\n', ''))
-                df.columns = colnames
+                df = read_excel_with_header_detection(v, 'sw')
+            df.columns = clean_col_names(df.columns)
             if not test_for_missing_columns('sw', df, k):
-                swdfsdic.update(deconstructMultilevelBOM(df, 'sw', k))
-        except:
-            printStr = '\nError processing file: ' + v + '\nIt has been excluded from the BOM check.\n'
-            printStrs += printStr
-            print(printStr)
-    sldfsdic = {}  # for collecting SL BOMs to a dic
-    for k, v in slfilesdic.items():
+                return deconstructMultilevelBOM(df, 'sw', k)
+            return {}
+        if cfg['chunksize'] and file_extension.lower() in ['.csv', '.txt', '.xlsx']:
+            # Huge multi-assembly export.  Keep only assys that SW BOMs exist for.
+            sldfsdic = {}
+            for dfassy in read_multilevel_bom_in_chunks(v, cfg['chunksize']):
+                if not test_for_missing_columns('sl', dfassy, k):
+                    dic = deconstructMultilevelBOM(dfassy, 'sl', 'TOPLEVEL')
+                    sldfsdic.update({a: b for a, b in dic.items() if keep is None or a in keep})
+            return sldfsdic
+        if file_extension.lower() == '.csv' or file_extension.lower() == '.txt':
+            encoding, sep = sniff_text_format(v)
+            try:
+                df = pd.read_csv(bom_source(v), na_values=[' '], engine='c',
+                                 skiprows=header_row_of_text_file(v, 'sl', encoding, sep),
+                                 encoding=encoding, sep=sep)
+            except UnicodeError:
+                printStr = ("\nError. The file " + v + " appeared to be\n"
+                            "encoded as " + encoding + ", but isn't.  It has been excluded from the\n"
+                            "BOM check.  The best way to achieve a functional csv file is:\n\n"
+                            '    From Excel, save the file as type “Unicode Text (*.txt)”, and then\n'
+                            '    change the file extension from txt to csv.\n\n'
+                            "On the other hand you can use an Excel file (.xlsx) instead of a csv file.\n")
+                echo(printStr)
+                return {}
+        elif cfg['multisheet'] and file_extension.lower() in ['.xlsx', '.xls']:
+            return read_workbook_sheets(v, 'sl', k)
+        elif file_extension.lower() == '.xlsx' or file_extension.lower == '.xls':
+            df = read_excel_with_header_detection(v, 'sl')
+        df.columns = clean_col_names(df.columns)
+        if not test_for_missing_columns('sl', df, k):
+            return deconstructMultilevelBOM(df, 'sl', k)
+    except:
+        printStr = '\nError processing file: ' + v + '\nIt has been excluded from the BOM check.\n'
+        echo(printStr)
+    return {}
+
+
+def read_multilevel_bom_in_chunks(filename, chunksize=50000):
+    ''' A generator that reads a SyteLine BOM export, which may contain
+    many top level assemblies (i.e. many rows with a Level of 0), chunksize
+    rows at a time.  Each time a complete top level assembly has been read,
+    its BOM is yielded.  Memory used is thus bounded by the size of the
+    largest assembly plus one chunk rather than the size of the whole file.
+
+    For this function to split up the file, the column named Level (see
+    cfg['col']['level_sl']) must exist.  If it doesn't, the whole file is
+    yielded as one BOM.
+
+    Parmeters
+    =========
+
+    filename: string
+        Name of a csv or xlsx file.  (see the function sniff_text_format
+        regarding the encoding and delimiter of a csv file)
+
+    chunksize: int
+        Number of rows to read at a time.  Default: 50000
+
+    Yields
+    ======
+
+    out: Pandas DataFrame
+        The BOM of one top level assembly, starting with its level 0 row.
+    '''
+    _, file_extension = os.path.splitext(filename)
+    if file_extension.lower() == '.xlsx':
+        chunks = _read_excel_in_chunks(filename, chunksize)
+    else:
+        encoding, sep = sniff_text_format(filename)
+        chunks = pd.read_csv(bom_source(filename), na_values=[' '], engine='c',
+                             skiprows=header_row_of_text_file(filename, 'sl', encoding, sep),
+                             encoding=encoding, sep=sep, chunksize=chunksize)
+    pending = None   # rows of an assembly whose end hasn't been reached yet
+    for chunk in chunks:
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        lvl = col_name(chunk, cfg['col']['level_sl'])
+        if not lvl:
+            pending = chunk
+            continue
+        starts = np.flatnonzero(pd.to_numeric(chunk[lvl], errors='coerce').values == 0)
+        if starts.size:
+            starts[0] = 0    # any leading rows stay with the first assembly
+        for a, b in zip(starts[:-1], starts[1:]):
+            yield chunk.iloc[a:b].reset_index(drop=True)
+        pending = chunk.iloc[starts[-1]:] if starts.size else chunk
+    if pending is not None and not pending.empty:
+        yield pending.reset_index(drop=True)
+
+
+def _read_excel_in_chunks(filename, chunksize):
+    ''' Read a SL xlsx file with openpyxl's read-only mode and yield
+    DataFrames of chunksize rows each.  (see the function find_header_row
+    regarding how the header row is found)'''
+    import openpyxl
+    wb = openpyxl.load_workbook(bom_source(filename), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        head = list(itertools.islice(rows, cfg['header_scan_rows']))
+        hdr = detect_header_row(head, 'sl', '.xlsx')
+        header = clean_col_names(['' if h is None else h for h in head[hdr]]) if hdr < len(head) else []
+        data = list(head[hdr+1:])
+        for row in rows:
+            data.append(row)
+            if len(data) >= chunksize:
+                yield pd.DataFrame(data, columns=header).replace(' ', np.nan)
+                data = []
+        if data:
+            yield pd.DataFrame(data, columns=header).replace(' ', np.nan)
+    finally:
+        wb.close()
+
+
+def read_bom_from_stdin(source):
+    ''' Read a BOM piped to stdin; e.g. from a script that extracts BOMs from
+    an ERP system.  The text can be tab or comma delimited.  The delimiter is
+    determined from the row containing column headings.  Commas in the
+    DESCRIPTION field of comma delimited SW BOMs are handled as they are for
+    SW csv files (see the function make_csv_file_stable).
+
+    Parmeters
+    =========
+
+    source: string
+        "sw" or "sl".  Determines the number of rows to skip before the row
+        containing column headings (see cfg['skiprows_sw'] and
+        cfg['skiprows_sl']).
+
+    Returns
+    =======
+
+    out: Pandas DataFrame or None
+        None is returned if nothing could be read.
+    '''
+    text = sys.stdin.read()
+    skiprows = cfg['skiprows_sw'] if source == 'sw' else cfg['skiprows_sl']
+    lines = text.splitlines()
+    if len(lines) <= skiprows:
+        printStr = '\nNo BOM was found in the data piped to stdin.\n'
+        echo(printStr)
+        return None
+    sep = '\t' if '\t' in lines[skiprows] else ','
+    dtype = dict.fromkeys(cfg['col']['itm_sw'], 'str') if source == 'sw' else None
+    engine = 'c'
+    if source == 'sw' and sep == ',':   # commas may be in the DESCRIPTION field
+        text = ''.join(make_csv_lines_stable([line + '\n' for line in lines], skiprows))
+        sep, engine = '$', 'python'
+    try:
+        return pd.read_csv(io.StringIO(text), na_values=[' '], skiprows=skiprows,
+                           sep=sep, dtype=dtype, engine=engine)
+    except ValueError as e:   # includes pandas' ParserError and EmptyDataError
+        printStr = ('\nThe data piped to stdin could not be read as a BOM and has been\n'
+                    'excluded from the BOM check: ' + str(e) + '\n')
+        echo(printStr)
+        return None
+
+
+def read_clipboard_with_timeout(timeout=5):
+    ''' Read a BOM from the clipboard.  On some computers, e.g. a Linux
+    machine with no display, reading the clipboard can hang.  So the
+    clipboard is read by a separate thread, and if it doesn't finish within
+    timeout seconds the clipboard is ignored.
+
+    Returns
+    =======
+
+    out: Pandas DataFrame or None
+        None is returned if the clipboard couldn't be read in time or it
+        contained nothing that could be interpreted as a BOM.
+    '''
+    result = []
+    def target():
         try:
-            _, file_extension = os.path.splitext(v)
-            if file_extension.lower() == '.csv' or file_extension.lower() == '.txt':
-                try:
-                    df = pd.read_csv(v, na_values=[' '], engine='python', 
-                                     skiprows=cfg['skiprows_sl'],
-                                     encoding='utf-16', sep='\t')
-                except UnicodeError:
-                    printStr = ("\nError. Probable cause: This program expects Unicode text encoding from\n"
-                                "a csv file.  The file " + v + " does not have this.  The\n"
-                                "correct way to achieve a functional csv file is:\n\n"
-                                '    From Excel, save the file as type “Unicode Text (*.txt)”, and then\n'
-                                '    change the file extension from txt to csv.\n\n'
-                                "On the other hand you can use an Excel file (.xlsx) instead of a csv file.\n")
-                    printStrs += printStr
-                    print(printStr)
-                    sys.exit(1)
-            elif file_extension.lower() == '.xlsx' or file_extension.lower == '.xls':
-                df = pd.read_excel(v, na_values=[' '], skiprows=cfg['skiprows_sl'])
-            if not test_for_missing_columns('sl', df, k):
-                sldfsdic.update(deconstructMultilevelBOM(df, 'sl', k))
+            result.append(pd.read_clipboard(engine='python', na_values=[' ']))
         except:
-            printStr = '\nError processing file: ' + v + '\nIt has been excluded from the BOM check.\n'
-            printStrs += printStr
-            print(printStr)
-    try:
-        df = pd.read_clipboard(engine='python', na_values=[' '])
-        if not test_for_missing_columns('sl', df, 'BOMfromClipboard', printerror=False):
-            sldfsdic.update(deconstructMultilevelBOM(df, 'sl', 'TOPLEVEL'))
-    except:
-        pass
-    if os.path.islink(dirname):
-        dirname = os.readlink(dirname)
-    return dirname, swdfsdic, sldfsdic
+            pass
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    t.join(timeout)
+    if t.is_alive():
+        printStr = ('\nReading the clipboard took more than ' + str(timeout) +
+                    ' seconds.  It has been ignored.\n')
+        echo(printStr)
+        return None
+    return result[0] if result else None
 
 
 def test_for_missing_columns(bomtype, df, pn, printerror=True):
@@ -595,7 +2115,7 @@ def test_for_missing_columns(bomtype, df, pn, printerror=True):
     present.  This function looks at those BOMs that are within df to see if
     any required columns are missing.  If found, print to screen.
 
-    calls: test_alternative_column_names
+    calls: missing_columns
 
     Parameters
     ==========
@@ -615,34 +2135,19 @@ def test_for_missing_columns(bomtype, df, pn, printerror=True):
     out: bool
         True if BOM afoul.  Otherwise False.
     '''
-    global printStrs
-    if bomtype == 'sw':
-        required_columns = [cfg['col']['qty'], cfg['col']['descrip'],
-                            cfg['col']['part_num'], cfg['col']['itm_sw']]
-    else: # 'for sl bom'
-        required_columns = [cfg['col']['qty'], cfg['col']['descrip'],
-                            cfg['col']['part_num'], cfg['col']['um_sl']]
-            
-    missing = []
-    for r in required_columns:
-        if isinstance(r, str) and r not in df.columns:
-            missing.append(r)
-        elif isinstance(r, list) and test_alternative_column_names(r, df.columns):
-            missing.append(' or '.join(test_alternative_column_names(r, df.columns)))
+    missing = missing_columns(bomtype, df.columns)
     if missing and bomtype=='sw' and printerror:
         printStr = ('\nEssential BOM columns missing.  SolidWorks requires a BOM header\n' +
               'to be in place.  This BOM will not be processed:\n\n' +
               '    missing: ' + ' ,'.join(missing) +  '\n' +
               '    missing in: ' + pn + '\n') 
-        printStrs += printStr
-        print(printStr)
+        echo(printStr)
         return True
     elif missing and printerror:
         printStr = ('\nEssential BOM columns missing.  This BOM will not be processed:\n' +
                     '    missing: ' + ' ,'.join(missing) +  '\n\n' +
                     '    missing in: ' + pn + '\n')
-        printStrs += printStr
-        print(printStr)
+        echo(printStr)
         return True
     elif missing:
         return True
@@ -650,6 +2155,28 @@ def test_for_missing_columns(bomtype, df, pn, printerror=True):
         return False
 
 
+def missing_columns(bomtype, columns):
+    ''' Return a list of the essential columns of a SW or SL BOM (bomtype is
+    "sw" or "sl") that aren't in columns.  Where a column has alternative
+    names, the item in the list is like "QTY or Qty or Quantity".
+
+    calls: test_alternative_column_names
+    '''
+    if bomtype == 'sw':
+        required_columns = [cfg['col']['qty'], cfg['col']['descrip'],
+                            cfg['col']['part_num'], cfg['col']['itm_sw']]
+    else: # 'for sl bom'
+        required_columns = [cfg['col']['qty'], cfg['col']['descrip'],
+                            cfg['col']['part_num'], cfg['col']['um_sl']]
+    missing = []
+    for r in required_columns:
+        if isinstance(r, str) and r not in columns:
+            missing.append(r)
+        elif isinstance(r, list) and test_alternative_column_names(r, columns):
+            missing.append(' or '.join(test_alternative_column_names(r, columns)))
+    return missing
+
+
 def test_alternative_column_names(tpl, lst):
     ''' tpl contains alternative names for a required column in a bom.  If 
     none of the names in tpl match a name in lst, return tpl so that the
@@ -691,16 +2218,364 @@ def col_name(df, col):
         names from df (i.e. from df.columns)
 
     Returns
-    -------
-    out: string
-        Name of column that is common to both df.columns and col
+    -------
+    out: string
+        Name of column that is common to both df.columns and col.  If more
+        than one is common, the one listed first in col is returned.  If none,
+        an empty string is returned.
+    '''
+    df_cols_as_set = set(df.columns)
+    for c in col:
+        if c in df_cols_as_set:
+            return c
+    return ""
+
+
+def col_alias_map():
+    ''' From the column names listed in cfg['col'] create a dictionary that
+    maps each column name (alias) to the name of the group it belongs to
+    (canonical name) and its priority within that group.  E.g.
+    {'QTY': [('qty', 0)], 'QTY.': [('qty', 1)], 'Qty': [('qty', 2)], ...}.
+    The dictionary is created once and then reused until cfg['col'] changes.
+    '''
+    key = repr(sorted(cfg['col'].items()))
+    if key not in _col_alias_maps:
+        amap = {}
+        for canonical, aliases in cfg['col'].items():
+            for priority, alias in enumerate(aliases):
+                amap.setdefault(alias, []).append((canonical, priority))
+        _col_alias_maps[key] = amap
+    return _col_alias_maps[key]
+
+_col_alias_maps = {}
+
+
+def clean_col_names(colnames):
+    ''' Rid column names of newline characters, surrounding quotation marks,
+    and leading/trailing spaces; e.g. "QTY\\n" becomes "QTY".'''
+    return [c.replace('\n', '').strip().strip('"') if isinstance(c, str) else c
+            for c in colnames]
+
+
+def find_header_row(rows, source):
+    ''' Find the row that contains a BOM's column headings.  That is, find
+    the first row that contains at least one of the alternative names (see
+    cfg['col']) of each column required for a BOM (see the function
+    test_for_missing_columns).
+
+    Parameters
+    ==========
+
+    rows: list
+        The first rows of a BOM.  Each row is a list of cell values.
+
+    source: string
+        "sw" or "sl"
+
+    Returns
+    =======
+
+    out: int or None
+        Index of the header row within rows, or None if not found.
+    '''
+    amap = col_alias_map()
+    if source == 'sw':
+        required = {'qty', 'descrip', 'part_num', 'itm_sw'}
+    else:
+        required = {'qty', 'descrip', 'part_num', 'um_sl'}
+    for i, row in enumerate(rows):
+        found = set()
+        for cell in clean_col_names(row):
+            for canonical, _ in amap.get(cell, []) if isinstance(cell, str) else []:
+                found.add(canonical)
+        if required <= found:
+            return i
+    return None
+
+
+def detect_header_row(rows, source, ext=''):
+    ''' Return the index of the header row within rows (see the function
+    find_header_row).  Files created from the same template have the same
+    layout above their data, so header rows found are cached along with a
+    fingerprint of the template: the number of non-empty cells in each row
+    down to and including the header row.  (Data rows vary from file to
+    file, so they aren't part of the fingerprint.)  For a file whose top
+    rows have a cached fingerprint, only the cached header row is checked,
+    and only if it isn't a header row are all the rows searched.  If
+    cfg['autoheader'] is False or no header row is found, cfg['skiprows_sw']
+    or cfg['skiprows_sl'] is returned.
+    '''
+    skiprows = cfg['skiprows_sw'] if source == 'sw' else cfg['skiprows_sl']
+    if not cfg['autoheader']:
+        return skiprows
+
+    def fingerprint(rows):
+        return tuple(sum(1 for c in row if c is not None and
+                         not (isinstance(c, float) and c != c) and str(c).strip())
+                     for row in rows)
+
+    layouts = _header_layouts.setdefault((source, ext.lower()), {})  # header row -> fingerprints
+    for hdr, fingerprints in layouts.items():
+        if (hdr < len(rows) and fingerprint(rows[:hdr+1]) in fingerprints and
+                find_header_row([rows[hdr]], source) == 0):
+            return hdr
+    hdr = find_header_row(rows, source)
+    if hdr is None:
+        return skiprows
+    layouts.setdefault(hdr, set()).add(fingerprint(rows[:hdr+1]))
+    return hdr
+
+_header_layouts = {}
+
+
+def sniff_text_format(filename, nbytes=8192):
+    ''' Determine the encoding and the delimiter of a csv file from its
+    first nbytes bytes.  The encoding is determined from a byte order mark
+    (BOM) at the start of the file if there is one; e.g. the one Excel puts
+    at the start of a "Unicode Text" file.  Otherwise it's utf-16 if every
+    other byte is a null byte, utf-8 if the bytes are valid utf-8, or else
+    ISO-8859-1.  The delimiter is whichever of tab, comma, semicolon, or |
+    occurs the same nonzero number of times in the most lines, so that title
+    lines above the column headings don't mislead it.  Results are cached by
+    filename, size, and modification time.
+
+    Returns
+    =======
+
+    out: tuple
+        (encoding, delimiter), e.g. ('utf-16', '\\t')
+    '''
+    key = (os.path.abspath(filename),) + bom_file_stat(filename)
+    if key in _text_formats:
+        return _text_formats[key]
+    with open_bom_file(filename, 'rb') as f:
+        head = f.read(nbytes)
+    if head.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    elif head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        encoding = 'utf-16'
+    elif len(head) > 1 and head[1::2].count(0) > len(head) // 4:
+        encoding = 'utf-16-le'
+    elif len(head) > 1 and head[0::2].count(0) > len(head) // 4:
+        encoding = 'utf-16-be'
+    else:
+        try:
+            head.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError as e:
+            # a multibyte character may have been cut off at the end
+            encoding = 'utf-8' if e.start >= len(head) - 3 else 'ISO-8859-1'
+    text = head.decode(encoding, errors='ignore')
+    lines = text.splitlines()
+    if len(head) == nbytes and len(lines) > 1:
+        lines = lines[:-1]   # the last line was probably cut off
+    lines = lines[:20]
+
+    def consistency(sep):
+        # no. of lines in which sep occurs the most common nonzero no. of times
+        counts = collections.Counter(line.count(sep) for line in lines)
+        counts.pop(0, None)
+        return max(counts.values()) if counts else 0
+
+    sep = max(['\t', ',', ';', '|'], key=consistency)
+    sep = sep if consistency(sep) else '\t'
+    _text_formats[key] = (encoding, sep)
+    return encoding, sep
+
+_text_formats = {}
+
+
+def header_row_of_text_file(filename, source, encoding, sep):
+    ''' Return the number of rows to skip in a csv file to reach the row
+    containing column headings.  Only the first cfg['header_scan_rows']
+    lines are read.  (see the function detect_header_row)'''
+    if not cfg['autoheader']:
+        return cfg['skiprows_sw'] if source == 'sw' else cfg['skiprows_sl']
+    with open_bom_file(filename, encoding=encoding) as f:
+        rows = [line.rstrip('\r\n').split(sep)
+                for line in itertools.islice(f, cfg['header_scan_rows'])]
+    return detect_header_row(rows, source, os.path.splitext(filename)[1])
+
+
+def read_excel_with_header_detection(filename, source, sheet_name=0, ext=None):
+    ''' Read an Excel file once, without assuming which row contains the
+    column headings, then find that row (see the function detect_header_row)
+    and use it for the column names.  Rows above it are discarded.  filename
+    can also be a pandas ExcelFile object, i.e. an already opened workbook,
+    in which case ext, the extension of the workbook's filename (e.g.
+    ".xlsx"), must be given.'''
+    if isinstance(filename, str):
+        ext = os.path.splitext(filename)[1]
+        filename = bom_source(filename)
+    raw = pd.read_excel(filename, sheet_name=sheet_name, header=None, na_values=[' '])
+    head = raw.head(cfg['header_scan_rows']).values.tolist()
+    hdr = detect_header_row(head, source, ext)
+    df = raw.iloc[hdr+1:].reset_index(drop=True)
+    df.columns = clean_col_names(raw.iloc[hdr].tolist()) if hdr < len(raw) else df.columns
+    return df.infer_objects()
+
+
+def read_head_rows(filename, source, nrows=None, all_sheets=False):
+    ''' Return the first nrows rows of a BOM file as a list of lists of cell
+    values without reading the rest of the file.  xlsx files are opened with
+    openpyxl's read-only mode.  SW csv files are read as bomcheck expects
+    them to be (ISO-8859-1, comma delimited).  The encoding and delimiter of
+    SL csv files are sniffed (see the function sniff_text_format).  If nrows
+    is None, cfg['header_scan_rows'] is used.  If all_sheets is True and the
+    file is an Excel file, a dictionary is returned instead: keys are sheet
+    names, values are the first nrows rows of the sheets.'''
+    nrows = nrows if nrows else cfg['header_scan_rows']
+    _, file_extension = os.path.splitext(filename)
+    if file_extension.lower() == '.xlsx':
+        import openpyxl
+        wb = openpyxl.load_workbook(bom_source(filename), read_only=True, data_only=True)
+        try:
+            sheets = {ws.title: [list(r) for r in itertools.islice(ws.iter_rows(values_only=True), nrows)]
+                      for ws in (wb.worksheets if all_sheets else wb.worksheets[:1])}
+            return sheets if all_sheets else list(sheets.values())[0]
+        finally:
+            wb.close()
+    elif file_extension.lower() == '.xls':
+        sheets = pd.read_excel(bom_source(filename), header=None, nrows=nrows,
+                               sheet_name=None if all_sheets else 0)
+        if all_sheets:
+            return {name: df.values.tolist() for name, df in sheets.items()}
+        return sheets.values.tolist()
+    encoding, sep = ('ISO-8859-1', ',') if source == 'sw' else sniff_text_format(filename)
+    with open_bom_file(filename, encoding=encoding) as f:
+        return [line.rstrip('\r\n').split(sep) for line in itertools.islice(f, nrows)]
+
+
+@holds_zip_member
+def preflight_file(source, k, v):
+    ''' Check the head of one SW or SL file (source is "sw" or "sl") and
+    return a list of problems found; an empty list if none.  k is the assy
+    pn derived from the filename, and v is the filename.  (see the function
+    preflight_check)  If cfg['multisheet'] is True, every sheet of an Excel
+    file is checked, as every sheet will be read (see the function
+    read_workbook_sheets).
+
+    calls: read_head_rows, detect_header_row, missing_columns
+    '''
+    ext = os.path.splitext(v)[1]
+    multisheet = cfg['multisheet'] and ext.lower() in ['.xlsx', '.xls']
+    try:
+        sheets = read_head_rows(v, source, all_sheets=True) if multisheet else {None: read_head_rows(v, source)}
+    except UnicodeError:
+        return [v + ': not ' + ('ISO-8859-1' if source == 'sw' else sniff_text_format(v)[0]) +
+                ' encoded, as it first appeared to be']
+    except Exception as e:
+        return [v + ': unreadable (' + type(e).__name__ + ': ' + str(e) + ')']
+    problems = []
+    for sheet, rows in sheets.items():
+        name = v if sheet is None or len(sheets) == 1 else v + ' (sheet "' + str(sheet) + '")'
+        if not rows:
+            problems.append(name + ': empty')
+            continue
+        hdr = detect_header_row(rows, source, ext)
+        header = clean_col_names(['' if h is None else h for h in rows[hdr]]) if hdr < len(rows) else []
+        missing = missing_columns(source, header)
+        if missing:
+            problems.append(name + ': missing ' + ', '.join(missing))
+    return problems
+
+
+def preflight_check(filename):
+    ''' Before the BOM check is done, check in seconds that each of the
+    files can be processed.  Only the first cfg['header_scan_rows'] rows of
+    each file are read (see the function read_head_rows), and files are read
+    concurrently.  Reported are:
+
+    - files that can't be read or aren't encoded as bomcheck expects,
+    - files missing essential columns (see the function missing_columns),
+    - SW files without a SL file of the same name, and SL files without a SW
+      file of the same name.  These are reported as warnings only, because
+      a SL file may contain the BOMs of many assemblies.
+
+    calls: split_sw_sl_fnames, preflight_file
+
+    Parmeters
+    =========
+
+    filename: list
+        List of filenames to be checked.
+
+    Returns
+    =======
+
+    out: bool
+        False if any file can't be processed, otherwise True.
+    '''
+    dirname, swfilesdic, slfilesdic = split_sw_sl_fnames(filename)
+    jobs = ([('sw', k, v) for k, v in swfilesdic.items()] +
+            [('sl', k, v) for k, v in slfilesdic.items()])
+    ctx = run_context()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(jobs) or 1)) as executor:
+        problems = [p for lst in executor.map(lambda job: ctx.run(preflight_file, *job), jobs)
+                    for p in lst]
+    unpaired = (['    ' + v + ': no SL file named ' + k + '_sl'
+                 for k, v in swfilesdic.items() if k not in slfilesdic] +
+                ['    ' + v + ': no SW file named ' + k + '_sw'
+                 for k, v in slfilesdic.items() if k not in swfilesdic])
+    printStr = ('\nPreflight check of ' + str(len(swfilesdic)) + ' SW and ' +
+                str(len(slfilesdic)) + ' SL files:\n')
+    if problems:
+        printStr += ('\nThese files can\'t be processed:\n\n' +
+                     '\n'.join('    ' + p for p in problems) + '\n')
+    if unpaired:
+        printStr += '\nUnpaired files:\n\n' + '\n'.join(unpaired) + '\n'
+    if not problems and not unpaired:
+        printStr += '    no problems found\n'
+    echo(printStr)
+    return not problems
+
+
+def read_workbook_sheets(filename, source, k):
+    ''' Read every sheet of an Excel file, each sheet being a BOM.  The
+    workbook is opened and parsed once.  The first few rows of each sheet
+    are looked at first, and sheets lacking required columns are skipped
+    without the rest of the sheet being read.  If the workbook has only one
+    sheet, k, the assy no. derived from the filename, is used as the assy
+    no.; otherwise sheet names are used.
+
+    calls: read_excel_with_header_detection, detect_header_row,
+    test_for_missing_columns, deconstructMultilevelBOM
+
+    Parmeters
+    =========
+
+    filename: string
+        Name of the Excel file.
+
+    source: string
+        "sw" or "sl"
+
+    k: string
+        Assy no. derived from the filename, e.g. 085952 from 085952_sw.xlsx
+
+    Returns
+    =======
+
+    out: dictionary
+        Keys are assy pns, values are DataFrames.  (see the function
+        deconstructMultilevelBOM)
     '''
-    try:
-        df_cols_as_set = set(list(df.columns))
-        intersect = df_cols_as_set.intersection(col)
-        return list(intersect)[0]
-    except IndexError:
-        return ""
+    dfsdic = {}
+    with pd.ExcelFile(bom_source(filename)) as xl:
+        sheets = xl.sheet_names
+        for sheet in sheets:
+            key = k if len(sheets) == 1 else str(sheet).strip()
+            head = xl.parse(sheet, header=None, nrows=cfg['header_scan_rows'] + 1)
+            rows = head.values.tolist()
+            hdr = detect_header_row(rows, source, os.path.splitext(filename)[1])
+            if hdr >= len(rows) or test_for_missing_columns(
+                    source, pd.DataFrame(columns=clean_col_names(rows[hdr])),
+                    key + ' (sheet "' + str(sheet) + '" of ' + filename + ')'):
+                continue
+            df = read_excel_with_header_detection(xl, source, sheet,
+                                                  os.path.splitext(filename)[1])
+            dfsdic.update(deconstructMultilevelBOM(df, source, key))
+    return dfsdic
 
 
 def deconstructMultilevelBOM(df, source, top='TOPLEVEL'):
@@ -790,7 +2665,7 @@ def deconstructMultilevelBOM(df, source, top='TOPLEVEL'):
             if top != "TOPLEVEL":
                 assys.append(top)
             elif 'Description' in df.columns and lvl == 0:
-                excelTitle.append((row[__pn], row['Description'])) # info for a global variable
+                run_context().excelTitle.append((row[__pn], row['Description'])) # info for the header of the Excel file
         elif row['__Level'] > lvl:
             if p in assys:
                 poplist.append('repeat')
@@ -945,6 +2820,37 @@ def is_in(find, xcept, series):
     return filtr
 
 
+def to_fixed(x):
+    ''' Convert quantities to scaled integers; i.e. to int64 values in units
+    of 1/QSCALE.  Sums and comparisons of these are exact, whereas those of
+    floats are not; e.g. 0.1 + 0.2 != 0.3.  x can be a number, a list, a
+    numpy array, or a pandas Series.  Values that aren't numbers become 0.'''
+    if np.isscalar(x):
+        return np.int64(round(float(x) * QSCALE))
+    x = pd.to_numeric(pd.Series(np.asarray(x, dtype=object)), errors='coerce')
+    return np.rint(x.fillna(0).values.astype(float) * QSCALE).astype(np.int64)
+
+
+def round_fixed(q, decimals):
+    ''' Round scaled integers (see the function to_fixed) to decimals decimal
+    places, rounding halves away from zero.'''
+    if decimals >= QDIGITS:
+        return q
+    step = 10**(QDIGITS - max(decimals, 0))
+    return np.sign(q) * ((np.abs(q) + step//2) // step * step)
+
+
+def from_fixed(q):
+    ''' Convert scaled integers (see the function to_fixed) back to floats.
+    Because the conversion is a single division, the float is the one
+    closest to the decimal value; e.g. 3.18, never 3.1799999999999997.'''
+    return q / QSCALE
+
+# Quantities are held as integer multiples of 10**-QDIGITS (see to_fixed)
+QDIGITS = 6
+QSCALE = 10**QDIGITS
+
+
 def convert_sw_bom_to_sl_format(df):
     '''Take a SolidWorks BOM and restructure it to be like that of a SyteLine
     BOM.  That is, the following is done:
@@ -968,7 +2874,7 @@ def convert_sw_bom_to_sl_format(df):
     - Column titles are changed to match those of SyteLine and thus will allow
       merging to a SyteLine BOM.
       
-    calls: create_um_factors
+    calls: create_um_factors, to_fixed, round_fixed, from_fixed
 
     Parmeters
     =========
@@ -1004,9 +2910,10 @@ def convert_sw_bom_to_sl_format(df):
         df['U'] = 'EA'  # if no length colunm exists then set all units of measure to EA
     
     df = df.reindex(['Op', 'WC','Item', 'Q', 'Description', 'U'], axis=1)  # rename and/or remove columns
+    df['Q'] = to_fixed(df['Q'])   # sum quantities exactly, as scaled integers
     dd = {'Q': 'sum', 'Description': 'first', 'U': 'first'}   # funtions to apply to next line
     df = df.groupby('Item', as_index=False).aggregate(dd).reindex(columns=df.columns)
-    df['Q'] = round(df['Q'], cfg['accuracy'])
+    df['Q'] = from_fixed(round_fixed(df['Q'].values.astype(np.int64), int(cfg['accuracy'])))
 
     if cfg['drop']==True:
         filtr3 = is_in(cfg['drop'], cfg['exceptions'], df['Item'])
@@ -1019,6 +2926,208 @@ def convert_sw_bom_to_sl_format(df):
     return df
 
 
+def edit_distance(s1, s2):
+    ''' Levenshtein distance between strings s1 and s2; that is, the minimum
+    number of single character insertions, deletions, or substitutions needed
+    to change s1 into s2.  E.g. 2648-0300-01 to 2648-0300-001 is 1.
+    '''
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    previous = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1, 1):
+        current = [i]
+        for j, c2 in enumerate(s2, 1):
+            current.append(min(previous[j] + 1,          # deletion
+                               current[j-1] + 1,         # insertion
+                               previous[j-1] + (c1 != c2)))  # substitution
+        previous = current
+    return previous[-1]
+
+
+def ngrams(s, n=3):
+    ''' Return the n character long substrings of s and how many times each
+    occurs, as a collections.Counter.  s is padded at each end so that the
+    first and last characters of s are well represented.  E.g.
+    ngrams('3086', 3) = Counter({'##3': 1, '#30': 1, '308': 1, '086': 1,
+    '86#': 1, '6##': 1})
+    '''
+    s = '#'*(n-1) + s + '#'*(n-1)
+    return collections.Counter(s[i:i+n] for i in range(len(s) - n + 1))
+
+
+def suggest_pn_pairings(pns1, pns2, maxdist=2, n=3):
+    ''' For each pn in pns1, find the pn in pns2 that is most similar to it,
+    and that is no more than maxdist character edits away.  Used to catch
+    mistyped pns; e.g. 2648-0300-01 in a SW BOM vs. 2648-0300-001 in a SL BOM.
+
+    Instead of comparing every pn in pns1 to every pn in pns2, an index of
+    the n-grams (see the function ngrams) of pns2 is first created.  Only those
+    pns that share enough n-grams with a pn from pns1 to possibly be within
+    maxdist edits of it are then compared with the function edit_distance.
+    (A string within k edits of another shares at least L + n - 1 - k*n
+    n-grams with it, where L is the length of the longer of the two strings.
+    n-grams that occur more than once, e.g. 000 in 0000-0000, are counted as
+    often as they occur in both strings.)
+
+    calls: ngrams, edit_distance
+
+    Parmeters
+    =========
+
+    pns1: list
+        Part numbers (strings) that suggestions are wanted for.
+
+    pns2: list
+        Part numbers (strings) from which suggestions are chosen.
+
+    maxdist: int
+        Maximum number of character edits allowed between two pns for them to
+        be considered a match.  Default: 2
+
+    n: int
+        Length of the n-grams used to index pns2.  Default: 3
+
+    Returns
+    =======
+
+    out: dictionary
+        Keys are pns from pns1.  Values are the best matching pns from pns2.
+        pns for which no suggestion was found are not included.
+    '''
+    index = {}   # n-gram -> list of (position in pns2, no. of occurrences)
+    for i, pn in enumerate(pns2):
+        for g, c in ngrams(pn, n).items():
+            index.setdefault(g, []).append((i, c))
+    suggestions = {}
+    for pn in pns1:
+        counts = {}
+        for g, c1 in ngrams(pn, n).items():
+            for i, c2 in index.get(g, []):
+                counts[i] = counts.get(i, 0) + min(c1, c2)
+        best, bestdist = None, maxdist + 1
+        for i, shared in counts.items():
+            pn2 = pns2[i]
+            if (abs(len(pn) - len(pn2)) > maxdist or
+                    shared < max(len(pn), len(pn2)) + n - 1 - maxdist*n):
+                continue
+            dist = edit_distance(pn, pn2)
+            if dist < bestdist or (dist == bestdist and pn2 < best):
+                best, bestdist = pn2, dist
+        if best is not None and best != pn:
+            suggestions[pn] = best
+    return suggestions
+
+
+def build_part_master(sldic):
+    ''' From all the SL BOMs create a part master: a DataFrame indexed by
+    pn (upper case) with the columns:
+
+    - desc: the description, normalized; i.e. words separated by one space.
+    - U: the U/M, stripped of leading and trailing spaces.
+    - ndesc, nu: number of different descriptions and U/Ms the pn has from
+      one SL BOM to another.
+    - consistent: True if ndesc and nu are both 1.
+    - obsolete: True if the pn is obsolete in any SL BOM.
+
+    Obsolete rows aren't used for desc and U.  The part master is put in
+    the run context (see the class RunContext) as partmaster, and is built
+    only once for a given sldic.  Also put there, as
+    partmaster_inconsistent, is a DataFrame of the descriptions of pns that
+    aren't the same in all SL BOMs; index is Item, columns are Description
+    and assy.
+
+    Parmeters
+    =========
+
+    sldic: dictionary
+        SL BOMs; keys are assy pns, values are DataFrames.  Not altered.
+
+    Returns
+    =======
+
+    out: Pandas DataFrame
+        The part master.
+    '''
+    ctx = run_context()
+    if ctx.partmaster_of is sldic:
+        return ctx.partmaster
+    frames = []
+    for assy, df in sldic.items():
+        pn, ds, um = (col_name(df, cfg['col']['part_num']), col_name(df, cfg['col']['descrip']),
+                      col_name(df, cfg['col']['um_sl']))
+        if not pn:
+            continue
+        frames.append(pd.DataFrame({
+            'pn': df[pn].astype(str).str.strip().str.upper().values,
+            'desc': (pd.Series(df[ds].values.astype(object)).str.split().str.join(' ').values
+                     if ds else np.nan),
+            'U': df[um].astype(str).str.strip().values if um else 'nan',
+            'obsolete': (df['Obsolete Date'].notnull().values if 'Obsolete Date' in df.columns
+                         else False),
+            'assy': assy}))
+    allrows = (pd.concat(frames, ignore_index=True) if frames else
+               pd.DataFrame(columns=['pn', 'desc', 'U', 'obsolete', 'assy']))
+    active = allrows[~allrows['obsolete'].astype(bool)]
+    g = active.groupby('pn')
+    pm = pd.DataFrame({'desc': g['desc'].first(), 'U': g['U'].first(),
+                       'ndesc': g['desc'].nunique(dropna=False),
+                       'nu': g['U'].nunique(dropna=False)})
+    pm['consistent'] = (pm['ndesc'] == 1) & (pm['nu'] == 1)
+    pm['obsolete'] = allrows.groupby('pn')['obsolete'].any().reindex(pm.index).fillna(False)
+    inconsistent = active[active['pn'].isin(pm.index[pm['ndesc'] > 1])]
+    inconsistent = (inconsistent.drop_duplicates(['pn', 'desc', 'assy'])
+                    .rename(columns={'pn': 'Item', 'desc': 'Description'})
+                    .sort_values(['Item', 'Description'])
+                    .set_index('Item')[['Description', 'assy']])
+    if len(inconsistent):
+        printStr = ('\n' + str(inconsistent.index.nunique()) + ' SL pns have different ' +
+                    'descriptions in different SL BOMs.\n(see the sheet named SL Descriptions)\n')
+        echo(printStr)
+    ctx.partmaster, ctx.partmaster_of, ctx.partmaster_results = pm, sldic, {}
+    ctx.partmaster_inconsistent = inconsistent
+    return pm
+
+
+def check_against_part_master(dfmerged, pm):
+    ''' For each row of a merged SW/SL BOM (see the function
+    check_a_sw_bom_to_a_sl_bom), determine whether the SW description and
+    U/M match those of the SL BOM.  For pns whose descriptions and U/Ms are
+    the same in all SL BOMs (see the function build_part_master), the SW
+    values are compared to the part master, and each distinct combination
+    of pn, SW description, and SW U/M is compared only once per BOM check;
+    the result is reused for every assembly the part is in.  Other rows are
+    compared as usual.
+
+    Returns
+    =======
+
+    out: tuple
+        Two boolean Series, indexed like dfmerged: True where descriptions
+        match, and True where U/Ms match.
+    '''
+    results = run_context().partmaster_results
+    consistent = ((dfmerged['_merge'] == 'both').values &
+                  dfmerged['Item'].map(pm['consistent']).fillna(False).values.astype(bool))
+    filtrM = np.zeros(len(dfmerged), dtype=bool)
+    filtrU = np.zeros(len(dfmerged), dtype=bool)
+    if consistent.any():
+        rows = dfmerged[consistent]
+        keys = list(zip(rows['Item'], rows['Description_sw'], rows['U_sw']))
+        for key in set(keys) - results.keys():
+            item, desc, um = key
+            results[key] = (isinstance(desc, str) and ' '.join(desc.split()) == pm.at[item, 'desc'],
+                            str(um).strip() == pm.at[item, 'U'])
+        filtrM[consistent] = [results[k][0] for k in keys]
+        filtrU[consistent] = [results[k][1] for k in keys]
+    if (~consistent).any():
+        rows = dfmerged[~consistent]
+        filtrM[~consistent] = (rows['Description_sw'].str.split() ==
+                               rows['Description_sl'].str.split()).values
+        filtrU[~consistent] = (rows['U_sw'].astype('str').str.strip() ==
+                               rows['U_sl'].astype('str').str.strip()).values
+    return pd.Series(filtrM, index=dfmerged.index), pd.Series(filtrU, index=dfmerged.index)
+
+
 def check_a_sw_bom_to_a_sl_bom(dfsw, dfsl):
     '''This function takes in one SW BOM and one SL BOM and then merges them.
     This merged BOM shows the BOM check allowing differences between the
@@ -1030,6 +3139,20 @@ def check_a_sw_bom_to_a_sl_bom(dfsw, dfsl):
     don't match.  q means quantity, d means description, u means unit of
     measure.
 
+    Quantities are compared as scaled integers (see the function to_fixed),
+    so the comparison is exact.  They match if they differ by no more than
+    cfg['tolerances'][U], where U is the unit of measure, or, if U isn't in
+    cfg['tolerances'], by no more than cfg['tolerance'].
+
+    If cfg['fuzzy'] is True, an additional column named Suggest is added.  For
+    a pn found only in the SW BOM, Suggest shows a similar pn that was found
+    only in the SL BOM, and vice versa.  (see the function suggest_pn_pairings)
+
+    If cfg['partmaster'] is True, descriptions and U/Ms are checked against
+    the part master instead.  (see the function check_against_part_master)
+
+    calls: suggest_pn_pairings, to_fixed, check_against_part_master
+
     Parmeters
     =========
 
@@ -1048,11 +3171,9 @@ def check_a_sw_bom_to_a_sl_bom(dfsw, dfsl):
 
     \u2009
     '''
-    global printStrs
     if not str(type(dfsw))[-11:-2] == 'DataFrame':
         printStr = '\nProgram halted.  A fault with SolidWorks DataFrame occurred.\n'
-        printStrs += printStr
-        print(printStr)
+        echo(printStr)
         sys.exit()
 
     # A BOM can be derived from different locations within SL.  From one location
@@ -1085,19 +3206,30 @@ def check_a_sw_bom_to_a_sl_bom(dfsw, dfsl):
     if x_lst:
         printStr = ("\nLower case part nos. in SyteLine's BOM have been converted " +
                     "to upper case for \nthis BOM check:\n")
-        printStrs += printStr
-        print(printStr)
+        echo(printStr)
         for y in x_lst:
             printStr = '    ' + y + '  changed to  ' + y.upper() + '\n'
-            printStrs += printStr
-            print(printStr)
+            echo(printStr)
 
     dfmerged = pd.merge(dfsw, dfsl, on='Item', how='outer', suffixes=('_sw', '_sl') ,indicator=True)
     dfmerged.sort_values(by=['Item'], inplace=True)
     filtrI = dfmerged['_merge'].str.contains('both')  # this filter determines if pn in both SW and SL
-    filtrQ = abs(dfmerged['Q_sw'] - dfmerged['Q_sl']) < .0051  # If diff in qty greater than this value, show X
-    filtrM = dfmerged['Description_sw'].str.split() == dfmerged['Description_sl'].str.split()
-    filtrU = dfmerged['U_sw'].astype('str').str.strip() == dfmerged['U_sl'].astype('str').str.strip()
+    # If diff in qty greater than the tolerance for the unit of measure, show X
+    qsw, qsl = (pd.to_numeric(dfmerged['Q_sw'], errors='coerce'),
+                pd.to_numeric(dfmerged['Q_sl'], errors='coerce'))
+    um = (dfmerged['U_sl'].where(dfmerged['U_sl'].notnull(), dfmerged['U_sw'])
+          .astype('str').str.strip().str.upper())
+    tol = um.map({k: int(to_fixed(v)) for k, v in cfg['tolerances'].items()})
+    tol = tol.fillna(int(to_fixed(cfg['tolerance']))).values.astype(np.int64)
+    filtrQ = (qsw.notnull() & qsl.notnull() &
+              (np.abs(to_fixed(qsw) - to_fixed(qsl)) <= tol))
+    dfmerged['Q_sw'] = pd.Series(from_fixed(to_fixed(qsw)), index=qsw.index).where(qsw.notnull())
+    dfmerged['Q_sl'] = pd.Series(from_fixed(to_fixed(qsl)), index=qsl.index).where(qsl.notnull())
+    if cfg['partmaster'] and run_context().partmaster is not None:
+        filtrM, filtrU = check_against_part_master(dfmerged, run_context().partmaster)
+    else:
+        filtrM = dfmerged['Description_sw'].str.split() == dfmerged['Description_sl'].str.split()
+        filtrU = dfmerged['U_sw'].astype('str').str.strip() == dfmerged['U_sl'].astype('str').str.strip()
     chkmark = '-'
     err = 'X'
 
@@ -1110,19 +3242,358 @@ def check_a_sw_bom_to_a_sl_bom(dfsw, dfsl):
     dfmerged['d'] = ~dfmerged['Item'].duplicated(keep=False) * dfmerged['d'] # duplicate in SL? d-> blank
     dfmerged['u'] = ~dfmerged['Item'].duplicated(keep=False) * dfmerged['u'] # duplicate in SL? u-> blank
 
-    dfmerged = dfmerged[['Item', 'i', 'q', 'd', 'u', 'Q_sw', 'Q_sl',
-                         'Description_sw', 'Description_sl', 'U_sw', 'U_sl']]
+    columns = ['Item', 'i', 'q', 'd', 'u', 'Q_sw', 'Q_sl',
+               'Description_sw', 'Description_sl', 'U_sw', 'U_sl']
+    if cfg['fuzzy']:  # suggest likely matches for pns that are in only SW or only SL
+        sw_only = dfmerged.loc[dfmerged['_merge'] == 'left_only', 'Item'].astype(str).tolist()
+        sl_only = dfmerged.loc[dfmerged['_merge'] == 'right_only', 'Item'].astype(str).tolist()
+        suggestions = suggest_pn_pairings(sw_only, sl_only, cfg['fuzzy_distance'])
+        suggestions.update(suggest_pn_pairings(sl_only, sw_only, cfg['fuzzy_distance']))
+        dfmerged['Suggest'] = (dfmerged['Item'].astype(str).map(suggestions)
+                               .where(dfmerged['_merge'] != 'both'))
+        columns.append('Suggest')
+    dfmerged = dfmerged[columns]
     dfmerged.fillna('', inplace=True)
     dfmerged.set_index('Item', inplace=True)
     return dfmerged
 
 
-def collect_checked_boms(swdic, sldic):
+def bom_tree(dic, source):
+    ''' From the BOMs of assemblies and subassemblies (see the function
+    deconstructMultilevelBOM) create a dictionary like
+    {'085952': {'2648-0300-001': (qty, um), ...}, ...}, i.e. keys are assy
+    pns and values are the pns of their children.  Quantities are scaled
+    integers (see the function to_fixed), and for SW BOMs, have been
+    converted as for the BOM check (see the function
+    convert_sw_bom_to_sl_format).  pns are upper case.  The BOMs in dic are
+    not altered.'''
+    tree = {}
+    for assy, df in dic.items():
+        df = df.copy()
+        if source == 'sw':
+            df = convert_sw_bom_to_sl_format(df)
+            pn, qty, um = 'Item', 'Q', 'U'
+        else:
+            if 'Obsolete Date' in df.columns:  # obsolete pns aren't used
+                df = df[df['Obsolete Date'].isnull()]
+            pn, qty, um = (col_name(df, cfg['col']['part_num']),
+                           col_name(df, cfg['col']['qty']), col_name(df, cfg['col']['um_sl']))
+        items = df[pn].astype(str).str.strip().str.upper().values
+        ums = (df[um].astype(str).str.strip().str.upper().values if um
+               else [''] * len(df))
+        children = {}
+        for item, q, u in zip(items, to_fixed(df[qty]), ums):
+            children[item] = (children.get(item, (0, u))[0] + int(q), u)
+        tree[assy.upper()] = children
+    return tree
+
+
+def subtree_hashes(tree):
+    ''' Return a dictionary of assy pn: hash of the assy's subtree, where
+    tree is like that from the function bom_tree.  Two assemblies have the
+    same hash if their children, the children's quantities and units of
+    measure, and the subtrees of those children are all the same.  Each
+    hash is calculated once, so time taken is proportional to the size of
+    the tree.'''
+    hashes = {}
+    def subtree_hash(pn, visiting):
+        if pn in hashes:
+            return hashes[pn]
+        if pn not in tree:
+            return b''          # a part, not an assembly
+        if pn in visiting:
+            return b'cycle'     # an assembly that contains itself; bad data
+        visiting.add(pn)
+        h = hashlib.blake2b(digest_size=16)
+        for child in sorted(tree[pn]):
+            h.update(repr((child,) + tree[pn][child]).encode('utf-8'))
+            h.update(subtree_hash(child, visiting))
+        visiting.discard(pn)
+        hashes[pn] = h.digest()
+        return hashes[pn]
+    for pn in tree:
+        subtree_hash(pn, set())
+    return hashes
+
+
+def tree_diff(swdic, sldic):
+    ''' Compare the structures of multilevel SW and SL BOMs.  Whereas the
+    function check_a_sw_bom_to_a_sl_bom compares one subassembly at a time,
+    so that a subassembly moved to a different parent appears as rows
+    missing from one sheet and extra rows on another, this function compares
+    the whole tree under each top level assembly and reports each node
+    (part or subassembly) that was:
+
+    - moved: under one parent in SW and under another in SL,
+    - added: in SW but not in SL,
+    - removed: in SL but not in SW,
+    - requantified: under the same parent in both, but quantities differ by
+      more than the tolerance (see cfg['tolerance'] and cfg['tolerances']).
+
+    Subtrees that are the same in SW and SL (see the function
+    subtree_hashes) are skipped without their contents being looked at.
+    Moves are found within each top level assembly; a node taken out of one
+    top level assembly and put into another is reported as removed from the
+    one and added to the other.
+
+    calls: bom_tree, subtree_hashes
+
+    Parmeters
+    =========
+
+    swdic: dictionary
+        SW BOMs; keys are assy pns, values are DataFrames.  (see the function
+        gatherBOMs_from_fnames)  Not altered.
+
+    sldic: dictionary
+        SL BOMs, like swdic.  Not altered.
+
+    Returns
+    =======
+
+    out: Pandas DataFrame
+        Index is the top level assy pn.  Columns are Item, change, SW parent,
+        SL parent, Q_sw, and Q_sl.
+    '''
+    swtree, sltree = bom_tree(swdic, 'sw'), bom_tree(sldic, 'sl')
+    swhash, slhash = subtree_hashes(swtree), subtree_hashes(sltree)
+    children = {c for kids in swtree.values() for c in kids}
+    roots = [a for a in swtree if a not in children and a in sltree]
+    rows = []
+    for root in roots:
+        added, removed = [], []   # (pn, parent, qty)
+        visited = set()
+        stack = [root]
+        while stack:
+            parent = stack.pop()
+            if parent in visited or swhash.get(parent) == slhash.get(parent):
+                continue   # already compared, or the same in SW and SL
+            visited.add(parent)
+            swkids, slkids = swtree.get(parent, {}), sltree.get(parent, {})
+            for child in sorted(swkids.keys() | slkids.keys()):
+                if child not in slkids:
+                    added.append((child, parent, swkids[child][0]))
+                elif child not in swkids:
+                    removed.append((child, parent, slkids[child][0]))
+                else:
+                    (qsw, um), (qsl, _) = swkids[child], slkids[child]
+                    if abs(qsw - qsl) > to_fixed(cfg['tolerances'].get(um, cfg['tolerance'])):
+                        rows.append((root, child, 'requantified', parent, parent,
+                                     from_fixed(qsw), from_fixed(qsl)))
+                if child in swtree and child in sltree:
+                    stack.append(child)
+        # A pn added under one parent and removed from another was moved
+        removed_by_pn = collections.defaultdict(collections.deque)
+        for pn, parent, qty in removed:
+            removed_by_pn[pn].append((parent, qty))
+        for pn, parent, qty in added:
+            if removed_by_pn[pn]:
+                slparent, slqty = removed_by_pn[pn].popleft()
+                rows.append((root, pn, 'moved', parent, slparent,
+                             from_fixed(qty), from_fixed(slqty)))
+            else:
+                rows.append((root, pn, 'added', parent, '', from_fixed(qty), ''))
+        for pn, lst in removed_by_pn.items():
+            for parent, qty in lst:
+                rows.append((root, pn, 'removed', '', parent, '', from_fixed(qty)))
+    df = pd.DataFrame(rows, columns=['assy', 'Item', 'change', 'SW parent',
+                                     'SL parent', 'Q_sw', 'Q_sl'])
+    printStr = ('\nTree diff: ' + str(len(roots)) + ' top level assemblies compared, ' +
+                str(len(df)) + ' structural differences found.\n')
+    echo(printStr)
+    return df.set_index('assy')
+
+
+def bom_digest(df):
+    ''' Return a hash of the contents of a BOM that doesn't depend on
+    where the BOM is within a multilevel BOM.  That is, the columns created
+    by deconstructMultilevelBOM and the item no. and level columns (see
+    cfg['col']) aren't hashed, and the order of rows doesn't matter.  Thus a
+    subassembly that appears in many assemblies, or under many pns, has the
+    same digest everywhere.'''
+    placement = set(['Level_pn', '__Level'] + cfg['col']['itm_sw'] + cfg['col']['level_sl'])
+    cols = sorted((c for c in df.columns if c not in placement), key=str)
+    h = hashlib.blake2b(repr(cols).encode('utf-8'), digest_size=16)
+    if cols:
+        h.update(np.sort(pd.util.hash_pandas_object(df[cols], index=False).values).tobytes())
+    return h.digest()
+
+
+def share_identical_boms(dic):
+    ''' Replace BOMs in dic that are identical to another BOM in dic (see
+    the function bom_digest) with that BOM, so that identical subassembly
+    BOMs are held in memory once.  Returns dic.
+
+    The digest of each BOM, and how many BOMs have it, are recorded in the
+    run context (see the function recorded_digest) for use by the function
+    compare_boms.  The BOMs themselves aren't kept by the run context, so a
+    BOM is freed once nothing else uses it.  A BOM must not be altered after
+    its digest has been recorded.'''
+    ctx = run_context()
+    seen = {}
+    for k, df in dic.items():
+        digest = bom_digest(df)
+        ctx.digest_counts[digest] += 1
+        df = dic[k] = seen.setdefault(digest, df)
+        if id(df) not in ctx.digests:
+            ctx.digests[id(df)] = (weakref.ref(df, lambda ref, i=id(df): ctx.digests.pop(i, None)),
+                                   digest)
+    return dic
+
+
+def recorded_digest(df):
+    ''' Return the digest of df recorded by the function share_identical_boms,
+    or None if none was recorded.'''
+    entry = run_context().digests.get(id(df))
+    return entry[1] if entry is not None and entry[0]() is df else None
+
+
+def compare_boms(dfsw, dfsl=None):
+    ''' Convert a SW BOM to SL format (see the function
+    convert_sw_bom_to_sl_format) and, unless dfsl is None, check it against
+    a SL BOM (see the function check_a_sw_bom_to_a_sl_bom).  Neither dfsw
+    nor dfsl is altered.
+
+    If the digest of dfsw (see the function share_identical_boms) is that of
+    more than one BOM, results are cached by the digests of dfsw and dfsl
+    and by the settings that affect them.  Thus when the same subassembly
+    BOMs appear in many assemblies, they are converted and checked once, and
+    the result is shared.  Other results aren't cached, so they're freed
+    once they have been used.
+
+    calls: recorded_digest, bom_digest, convert_sw_bom_to_sl_format,
+    check_a_sw_bom_to_a_sl_bom
+
+    Returns
+    =======
+
+    out: Pandas DataFrame
+        A converted SW BOM if dfsl is None, otherwise a merged SW/SL BOM.
+    '''
+    def compare():
+        result = convert_sw_bom_to_sl_format(dfsw.copy())
+        if dfsl is not None:
+            result = check_a_sw_bom_to_a_sl_bom(result, dfsl.copy())
+        return result
+
+    ctx = run_context()
+    digest = recorded_digest(dfsw)
+    if digest is None or ctx.digest_counts[digest] < 2:
+        return compare()
+    if dfsl is not None:
+        dfsl_digest = recorded_digest(dfsl)
+        dfsl_digest = dfsl_digest if dfsl_digest is not None else bom_digest(dfsl)
+    key = (digest, None if dfsl is None else dfsl_digest,
+           repr([cfg[k] for k in BomCheckSession.COMPARE_SETTINGS]))
+    if key in ctx.compare_cache:
+        ctx.compare_hits += 1
+    else:
+        ctx.compare_cache[key] = compare()
+    return ctx.compare_cache[key].copy()   # a copy, since concat_boms alters what it's given
+
+
+def adjacency_rows(tree, source):
+    ''' A generator that yields one tuple (top assy, parent, child, level,
+    qty, unit, source) for each parent/child link in tree (see the function
+    bom_tree).  Top assys are those that aren't a child of another assy in
+    tree.  level is 1 for the children of a top assy, 2 for their children,
+    and so forth.  A subassembly that appears more than once under a top
+    assy has its children listed once.'''
+    children = {c for kids in tree.values() for c in kids}
+    for top in (a for a in tree if a not in children):
+        expanded = set()
+        stack = [(top, 1)]
+        while stack:
+            parent, level = stack.pop()
+            if parent in expanded:
+                continue
+            expanded.add(parent)
+            for child, (qty, um) in tree[parent].items():
+                yield (top, parent, child, level, from_fixed(qty), um, source)
+                if child in tree:
+                    stack.append((child, level + 1))
+
+
+def export_adjacency(filename, swdic, sldic, batchsize=65536):
+    ''' Write the parent/child structure of all SW and SL BOMs to a file as
+    a normalized adjacency table, i.e. one row per parent/child link, with
+    the columns top, parent, child, level, qty, unit, and source ("sw" or
+    "sl").  Quantities and units of SW BOMs are converted as for a BOM check
+    (see the function bom_tree).
+
+    The file is written batchsize rows at a time.  If filename ends with
+    .parquet, a Parquet file is written, with one row group per batch, which
+    tools like pandas, Spark, and DuckDB can query a few columns of at a
+    time.  If it ends with .feather, a Feather (Arrow IPC) file is written,
+    which can be memory-mapped; e.g. with
+    pyarrow.ipc.open_file(pyarrow.memory_map(fn)).  Other names raise a
+    ValueError.  If pyarrow isn't installed, an ImportError is raised.
+
+    calls: bom_tree, adjacency_rows
+
+    Parmeters
+    =========
+
+    filename: string
+        Name of the file to write.
+
+    swdic: dictionary
+        SW BOMs; keys are assy pns, values are DataFrames.  (see the function
+        gatherBOMs_from_fnames)  Not altered.
+
+    sldic: dictionary
+        SL BOMs, like swdic.  Not altered.
+
+    batchsize: int
+        Number of rows to write at a time.  Default: 65536
+
+    Returns
+    =======
+
+    out: int
+        Number of rows written.
+    '''
+    if not filename.lower().endswith(('.parquet', '.feather')):
+        raise ValueError('adjacency table file name must end with .parquet or .feather: ' +
+                         filename)
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError('writing an adjacency table requires the pyarrow package.')
+    schema = pa.schema([('top', pa.string()), ('parent', pa.string()), ('child', pa.string()),
+                        ('level', pa.int32()), ('qty', pa.float64()), ('unit', pa.string()),
+                        ('source', pa.string())])
+    rows = itertools.chain(adjacency_rows(bom_tree(swdic, 'sw'), 'sw'),
+                           adjacency_rows(bom_tree(sldic, 'sl'), 'sl'))
+    if filename.lower().endswith('.parquet'):
+        writer = pyarrow.parquet.ParquetWriter(filename, schema)
+    else:
+        writer = pyarrow.ipc.new_file(filename, schema)
+    n = 0
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batchsize))
+            if not batch:
+                break
+            columns = list(zip(*batch))
+            arrays = [pa.array(col, type=field.type) for col, field in zip(columns, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            n += len(batch)
+    finally:
+        writer.close()
+    printStr = '\nCreated file: ' + filename + ' (' + str(n) + ' parent/child links)\n'
+    echo(printStr)
+    return n
+
+
+def collect_checked_boms(swdic, sldic, progress=None, cancel=None):
     ''' Match SolidWorks assembly nos. to those from SyteLine and then merge
     their BOMs to create a BOM check.  For any SolidWorks BOMs for which no
     SyteLine BOM was found, put those in a separate dictionary for output.
 
-    calls: convert_sw_bom_to_sl_format, check_a_sw_bom_to_a_sl_bom
+    calls: compare_boms, build_part_master
 
     Parameters
     ==========
@@ -1137,6 +3608,12 @@ def collect_checked_boms(swdic, sldic):
         are of assembly part numbers.  Dictionary values are pandas DataFrame
         objects which are BOMs for those assembly pns.
 
+    progress: function or None
+        Called before each BOM is checked.  (see the function bomcheck)
+
+    cancel: function or None
+        If cancel() returns True, no more BOMs are checked.
+
     Returns
     =======
 
@@ -1149,14 +3626,513 @@ def collect_checked_boms(swdic, sldic):
     '''
     lone_sw_dic = {}  # sw boms with no matching sl bom found
     combined_dic = {}   # sl bom found for given sw bom.  Then merged
-    for key, dfsw in swdic.items():
+    n = len(swdic)
+    nhits = run_context().compare_hits
+    if cfg['partmaster']:
+        build_part_master(sldic)
+    for i, (key, dfsw) in enumerate(swdic.items()):
+        if cancel and cancel():
+            break
+        if progress:
+            progress('compare', i, n, key)
         if key in sldic:
-            combined_dic[key] = check_a_sw_bom_to_a_sl_bom(convert_sw_bom_to_sl_format(dfsw), sldic[key])
+            combined_dic[key] = compare_boms(dfsw, sldic[key])
         else:
-            lone_sw_dic[key + '_sw'] = convert_sw_bom_to_sl_format(dfsw)
+            lone_sw_dic[key + '_sw'] = compare_boms(dfsw)
+    if progress:
+        progress('compare', n, n, '')
+    reused = run_context().compare_hits - nhits
+    if reused > 0:
+        printStr = ('\n' + str(reused) + ' BOMs were identical to BOMs already checked.  ' +
+                    'Their results\nwere reused.\n')
+        echo(printStr)
     return lone_sw_dic, combined_dic
 
 
+def iter_manifest(manifest):
+    ''' A generator that reads a manifest file one line at a time and yields
+    one dictionary per line, e.g. {'assy': '085952', 'sw_path':
+    'C:/dir/085952.xlsx', 'sl_path': 'C:/dir2/085952.xlsx', 'options':
+    'drop=1'}.  A manifest can be a csv file with a header line, or a json
+    file with one json object per line (a json file containing one list of
+    objects is also accepted, but it is read all at once).'''
+    _, ext = os.path.splitext(manifest)
+    with open(manifest, encoding='utf-8-sig', newline='') as f:
+        if ext.lower() in ['.json', '.jsonl']:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            if first == '[':
+                yield from json.loads(first + f.read())
+                return
+            line = first + f.readline()
+            while line:
+                if line.strip():
+                    yield json.loads(line)
+                line = f.readline()
+        else:
+            yield from csv.DictReader(f)
+
+
+def manifest_options(options):
+    ''' Convert the options of a manifest line to a dictionary of cfg
+    settings.  options is either a dictionary or a string like
+    "accuracy=3;drop=1;to_um=feet".  Only settings that affect a single
+    BOM check are allowed.'''
+    allowed = {'accuracy': int, 'drop': lambda x: str(x).lower() in ['1', 'true', 'yes'],
+               'from_um': str, 'to_um': str, 'skiprows_sw': int, 'skiprows_sl': int,
+               'fuzzy': lambda x: str(x).lower() in ['1', 'true', 'yes'], 'tolerance': float}
+    if not options:
+        return {}
+    if isinstance(options, str):
+        options = dict(o.split('=', 1) for o in options.split(';') if '=' in o)
+    return {k.strip(): allowed[k.strip()](v.strip() if isinstance(v, str) else v)
+            for k, v in options.items() if k.strip() in allowed}
+
+
+def check_manifest(manifest, progress=None, cancel=None):
+    ''' Check the SW/SL pairs listed in a manifest file instead of deriving
+    pairs from filenames (see the function iter_manifest regarding the format
+    of the file).  The manifest is read one line at a time, and each pair is
+    checked as soon as its line has been read, so a manifest with tens of
+    thousands of lines gets going immediately.  Relative paths are relative
+    to the directory of the manifest.  Options given on a line apply to that
+    pair only.  If an assy is listed more than once, or a subassembly is
+    found under more than one line, a warning is given and the last listing
+    wins.
+
+    calls: iter_manifest, manifest_options, read_bom_file, collect_checked_boms
+
+    Parmeters
+    =========
+
+    manifest: string
+        Name of the manifest file.
+
+    progress: function or None
+        Called before each pair is checked.  (see the function bomcheck)
+
+    cancel: function or None
+        If cancel() returns True, no more pairs are checked.
+
+    Returns
+    =======
+
+    out: tuple
+        The output tuple contains three items: 1. The directory of the
+        manifest, to which bomcheck.xlsx is written.  2. Dictionary of SW BOMs
+        for which no matching SL BOM was found (see collect_checked_boms).
+        3. Dictionary of merged SW/SL BOMs.
+    '''
+    dirname = os.path.dirname(os.path.abspath(manifest))
+    lone_sw_dic, combined_dic = {}, {}
+    seen = set()
+    for i, row in enumerate(iter_manifest(manifest)):
+        if cancel and cancel():
+            break
+        assy = str(row.get('assy') or '').strip()
+        swpath = str(row.get('sw_path') or '').strip()
+        slpath = str(row.get('sl_path') or '').strip()
+        if not assy or not swpath:
+            printStr = '\nManifest line ' + str(i+1) + ' has no assy or no sw_path.  It has been ignored.\n'
+            echo(printStr)
+            continue
+        if assy.upper() in seen:
+            printStr = '\nAssy ' + assy + ' is listed more than once in the manifest.  The last listing is used.\n'
+            echo(printStr)
+        seen.add(assy.upper())
+        if progress:
+            progress('compare', i, 0, assy)
+        try:
+            options = manifest_options(row.get('options'))
+        except (KeyError, ValueError):
+            printStr = '\nInvalid options on manifest line ' + str(i+1) + ': ' + str(row.get('options')) + '\n'
+            echo(printStr)
+            continue
+        saved = {k: cfg[k] for k in options}
+        cfg.update(options)
+        try:
+            swdic = read_bom_file('sw', assy, os.path.join(dirname, swpath))
+            sldic = read_bom_file('sl', assy, os.path.join(dirname, slpath)) if slpath else {}
+            lone_sw, combined = collect_checked_boms(swdic, sldic)
+            repeated = [k for k in list(lone_sw) + list(combined)
+                        if (k in lone_sw_dic or k in combined_dic)
+                        and k.upper() not in [assy.upper(), assy.upper() + '_SW']]
+            if repeated:
+                printStr = ('\nSubassemblies of manifest line ' + str(i+1) + ' were already checked for an\n'
+                            'earlier line; the results of line ' + str(i+1) + ' are used: ' +
+                            ', '.join(repeated) + '\n')
+                echo(printStr)
+            lone_sw_dic.update(lone_sw)
+            combined_dic.update(combined)
+        finally:
+            cfg.update(saved)
+    return dirname, lone_sw_dic, combined_dic
+
+
+def file_fingerprint(filename):
+    ''' Return (size, modification time) of a file.  If either changes, the
+    file is considered to have changed.  (see the function bom_file_stat)'''
+    return bom_file_stat(filename)
+
+
+def write_checkpoint(obj, fn):
+    ''' Pickle obj to the file fn atomically.  That is, obj is first written
+    to a temporary file in the same directory, which is flushed to disk and
+    then renamed to fn.  Thus if the computer crashes, fn is either the old
+    file or the new one, never a partially written one.'''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(fn), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, fn)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_checkpoint(fn):
+    ''' Return the object pickled in file fn, or None if fn doesn't exist or
+    can't be read.'''
+    try:
+        with open(fn, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def checkpointed_check(filename, ckdir=None, resume=False, progress=None, cancel=None):
+    ''' Do what the functions gatherBOMs_from_fnames and collect_checked_boms
+    do, but save the result of each assembly to a checkpoint directory as
+    soon as it has been checked.  Then if the run is interrupted (a crash, a
+    reboot, etc.), it can be resumed with resume=True.
+
+    The checkpoint directory contains two kinds of files, each written
+    atomically (see the function write_checkpoint):
+
+    - One file per assembly, holding its result along with the fingerprint
+      (see the function file_fingerprint) of the SW file it came from.
+    - One file per SW file, written once all of that file's assemblies have
+      been checked, listing those assemblies.
+
+    A result is reused only if the SW file's fingerprint is unchanged and the
+    run's digest is unchanged.  The digest covers the fingerprints of all SL
+    files and the settings that affect results (those of BomCheckSession's
+    READ_SETTINGS and COMPARE_SETTINGS), so a change to any SL file or
+    setting causes everything to be checked again.  If cfg['chunksize'] is
+    set, SL files are read in chunks keeping only the assemblies that the
+    SW files yet to be checked need, so those SW files are read twice.
+    SW files that were completely checked are not even read.  The final
+    results are built from the checkpoint directory.
+
+    SL BOMs supplied via stdin or the clipboard are not used by this function.
+
+    calls: split_sw_sl_fnames, read_bom_file, collect_checked_boms,
+    file_fingerprint, write_checkpoint, read_checkpoint
+
+    Parmeters
+    =========
+
+    filename: list
+        List of filenames to be analyzed.
+
+    ckdir: string or None
+        The checkpoint directory.  If None, a directory named
+        bomcheck_checkpoint is used in the directory bomcheck.xlsx is written
+        to.  Default: None
+
+    resume: bool
+        If True, reuse results already in the checkpoint directory.  If
+        False, start from scratch.  Default: False
+
+    progress: function or None
+        Called before each SW file is processed.  (see the function bomcheck)
+
+    cancel: function or None
+        If cancel() returns True, no more SW files are processed.  Results
+        already saved can be used later with resume=True.
+
+    Returns
+    =======
+
+    out: tuple
+        The output tuple contains three items: 1. The directory to which
+        bomcheck.xlsx is written.  2. Dictionary of SW BOMs for which no
+        matching SL BOM was found (see collect_checked_boms).  3. Dictionary
+        of merged SW/SL BOMs.
+    '''
+    dirname, swfilesdic, slfilesdic = split_sw_sl_fnames(filename)
+    ckdir = ckdir if ckdir else os.path.join(dirname, 'bomcheck_checkpoint')
+    os.makedirs(ckdir, exist_ok=True)
+    settings = [cfg.get(k) for k in BomCheckSession.READ_SETTINGS + BomCheckSession.COMPARE_SETTINGS]
+    slfps = sorted((os.path.abspath(v), file_fingerprint(v)) for v in slfilesdic.values())
+    digest = hashlib.sha1(repr((settings, slfps)).encode('utf-8')).hexdigest()
+    def ckname(prefix, *parts):
+        return os.path.join(ckdir, prefix + hashlib.sha1(repr(parts).encode('utf-8')).hexdigest() + '.pkl')
+
+    sldic = None   # SL BOMs are read only if some SW file needs checking
+    done = []      # (SW file, list of (kind, key)) in the order processed
+    n = len(swfilesdic)
+    for i, (k, v) in enumerate(swfilesdic.items()):
+        if cancel and cancel():
+            break
+        if progress:
+            progress('compare', i, n, v)
+        path, fp = os.path.abspath(v), file_fingerprint(v)
+        marker = read_checkpoint(ckname('file_', path)) if resume else None
+        if marker and marker['fp'] == fp and marker['digest'] == digest:
+            done.append((path, marker['keys']))
+            continue
+        if sldic is None:
+            keep = None
+            if cfg['chunksize']:  # keep only SL assys that the SW files yet to be checked need
+                keep = set()
+                for k2, v2 in list(swfilesdic.items())[i:]:
+                    keep.update(read_bom_file('sw', k2, v2))
+            sldic = {}
+            for k2, v2 in slfilesdic.items():
+                sldic.update(read_bom_file('sl', k2, v2, keep=keep))
+        keys = []
+        for key, dfsw in read_bom_file('sw', k, v).items():
+            fn = ckname('assy_', path, key)
+            record = read_checkpoint(fn) if resume else None
+            if not (record and record['fp'] == fp and record['digest'] == digest):
+                lone_sw, combined = collect_checked_boms({key: dfsw}, sldic)
+                kind, key2, df = (('merged', key, combined[key]) if combined
+                                  else ('sw', key + '_sw', lone_sw[key + '_sw']))
+                record = {'fp': fp, 'digest': digest, 'kind': kind, 'key': key2, 'df': df}
+                write_checkpoint(record, fn)
+            keys.append((record['kind'], record['key'], key))
+        write_checkpoint({'fp': fp, 'digest': digest, 'keys': keys}, ckname('file_', path))
+        done.append((path, keys))
+
+    lone_sw_dic, combined_dic = {}, {}
+    for path, keys in done:     # build results from the checkpoint directory
+        for kind, key2, key in keys:
+            record = read_checkpoint(ckname('assy_', path, key))
+            if record is None:
+                printStr = '\nCheckpoint of ' + key + ' could not be read.  Rerun without --resume.\n'
+                echo(printStr)
+            elif kind == 'merged':
+                combined_dic[key2] = record['df']
+            else:
+                lone_sw_dic[key2] = record['df']
+    return dirname, lone_sw_dic, combined_dic
+
+
+def pipeline_check(filename, depth=4, progress=None, cancel=None):
+    ''' Do what the functions gatherBOMs_from_fnames and collect_checked_boms
+    do, but overlap the reading of files with the comparison of BOMs.  Three
+    stages run at the same time:
+
+    1. A pool of depth threads reads and deconstructs files (I/O bound).
+       Files are read in an order such that a SW file is immediately followed
+       by its matching SL file, so pairs become available early.
+    2. One worker thread compares a SW BOM to a SL BOM as soon as both have
+       been loaded.  Once compared, the SW BOM is released.
+    3. The calling thread collects the results as they are produced.
+
+    Queues between the stages hold at most depth items, so the number of
+    BOMs held in memory is governed by depth.  (SL BOMs are retained until
+    the end because any SW file read later might need them.)  SW BOMs for
+    which no SL BOM was found are converted once all files have been read.
+
+    If the reader or the comparer raises an exception, the other stages are
+    stopped and the exception is raised again in the calling thread.
+
+    BOMs supplied via stdin or the clipboard are not used by this function,
+    and SL files are read whole, not in chunks (cfg['chunksize']), so the
+    bomcheck function doesn't use this function if those are set.
+
+    calls: split_sw_sl_fnames, read_bom_file, convert_sw_bom_to_sl_format,
+    check_a_sw_bom_to_a_sl_bom
+
+    Parmeters
+    =========
+
+    filename: list
+        List of filenames to be analyzed.
+
+    depth: int
+        Number of files that may be read ahead of the comparisons.  Default: 4
+
+    progress: function or None
+        Called as files are read and as BOMs are compared.  (see the function
+        bomcheck)  Note that it is called from the reader thread as well as
+        from the calling thread.
+
+    cancel: function or None
+        If cancel() returns True, no more files are read.  BOMs already read
+        are still compared.
+
+    Returns
+    =======
+
+    out: tuple
+        The output tuple contains three items: 1. The directory to which
+        bomcheck.xlsx is written.  2. Dictionary of SW BOMs for which no
+        matching SL BOM was found (see collect_checked_boms).  3. Dictionary
+        of merged SW/SL BOMs.
+    '''
+    depth = max(1, int(depth))
+    dirname, swfilesdic, slfilesdic = split_sw_sl_fnames(filename)
+    jobs = []
+    for k, v in swfilesdic.items():
+        jobs.append(('sw', k, v))
+        if k in slfilesdic:
+            jobs.append(('sl', k, slfilesdic[k]))
+    jobs += [('sl', k, v) for k, v in slfilesdic.items() if k not in swfilesdic]
+
+    loaded = queue.Queue(maxsize=depth)    # stage 1 -> stage 2
+    results = queue.Queue(maxsize=depth)   # stage 2 -> stage 3
+    stop = threading.Event()   # set when a stage fails, so the others stop
+    errors = []                # exceptions raised by the reader or comparer
+
+    def put(q, item):
+        # Like q.put(item), but give up if stop is set; a stage that has
+        # failed will never take item off of q.
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def get(q):
+        # Like q.get(), but return None if stop is set.
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def reader():
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=depth) as pool:
+                inflight = collections.deque()
+                for i, (source, k, v) in enumerate(jobs):
+                    if stop.is_set() or (cancel and cancel()):
+                        break
+                    if progress:
+                        progress('read', i, len(jobs), v)
+                    inflight.append((source, pool.submit(ctx.run, read_bom_file, source, k, v)))
+                    if len(inflight) >= depth:
+                        source, future = inflight.popleft()
+                        put(loaded, (source, future.result()))
+                while inflight:
+                    source, future = inflight.popleft()
+                    put(loaded, (source, future.result()))
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(loaded, None)
+
+    def comparer():
+        swdic, sldic = {}, {}
+        try:
+            while True:
+                item = get(loaded)
+                if item is None:
+                    break
+                source, dic = item
+                if source == 'sw':
+                    for key, dfsw in dic.items():
+                        if key in sldic:
+                            put(results, ('merged', key, compare_boms(dfsw, sldic[key])))
+                        else:
+                            swdic[key] = dfsw
+                else:
+                    sldic.update(dic)
+                    for key in dic:
+                        if key in swdic:
+                            put(results, ('merged', key, compare_boms(swdic.pop(key), sldic[key])))
+            for key, dfsw in swdic.items():
+                if stop.is_set():
+                    break
+                put(results, ('sw', key + '_sw', compare_boms(dfsw)))
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(results, None)
+
+    ctx = run_context()   # a new thread doesn't inherit the run context
+    threads = [threading.Thread(target=ctx.run, args=(reader,), daemon=True),
+               threading.Thread(target=ctx.run, args=(comparer,), daemon=True)]
+    for t in threads:
+        t.start()
+    lone_sw_dic = {}
+    combined_dic = {}
+    while True:
+        item = get(results)
+        if item is None:
+            break
+        kind, key, df = item
+        if progress:
+            progress('compare', len(lone_sw_dic) + len(combined_dic), 0, key)
+        if kind == 'merged':
+            combined_dic[key] = df
+        else:
+            lone_sw_dic[key] = df
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return dirname, lone_sw_dic, combined_dic
+
+
+def filter_mismatches(title_dfmerged, context=0):
+    ''' Most rows of a merged SW/SL BOM are usually all check marks.  Remove
+    them, keeping only rows that have an X in the i, q, d, or u columns plus
+    context rows above and below each of those rows.  Also create a summary
+    of how many rows of each BOM matched.
+
+    Parmeters
+    =========
+
+    title_dfmerged: list
+        A list of tuples, each tuple has two items: a string and a DataFrame.
+        The string is the assy pn for the DataFrame.  The DataFrame is that
+        of a merged SW/SL BOM.  (see the function check_a_sw_bom_to_a_sl_bom)
+
+    context: int
+        Number of rows above and below each row with an X to keep.
+        Default: 0
+
+    Returns
+    =======
+
+    out: tuple
+        The output tuple contains two items: 1. title_dfmerged with rows
+        removed from the DataFrames (a DataFrame may end up empty).  2. A
+        DataFrame indexed by assy pn with the columns rows, matched,
+        mismatched, and shown.
+    '''
+    filtered, summary = [], []
+    for title, df in title_dfmerged:
+        mismatched = (df[['i', 'q', 'd', 'u']] == 'X').any(axis=1).values
+        keep = mismatched
+        if context > 0 and mismatched.any():
+            keep = (pd.Series(mismatched.astype(int)).rolling(2*context + 1, center=True,
+                                                              min_periods=1).max() > 0).values
+        filtered.append((title, df[keep].copy()))
+        summary.append((title, len(df), len(df) - mismatched.sum(),
+                        mismatched.sum(), keep.sum()))
+    dfsummary = pd.DataFrame(summary, columns=['assy', 'rows', 'matched', 'mismatched',
+                                               'shown']).set_index('assy')
+    printStr = ('\nMismatches only: ' + str(dfsummary['shown'].sum()) + ' of ' +
+                str(dfsummary['rows'].sum()) + ' rows shown; ' +
+                str((dfsummary['mismatched'] == 0).sum()) + ' of ' + str(len(dfsummary)) +
+                ' BOMs matched completely.\n')
+    echo(printStr)
+    return filtered, dfsummary
+
+
 def concat_boms(title_dfsw, title_dfmerged):
     ''' Concatenate all the SW BOMs into one long list (if there are any SW
     BOMs without a matching SL BOM being found), and concatenate all the merged
@@ -1217,10 +4193,139 @@ def concat_boms(title_dfsw, title_dfmerged):
     return swresults, mrgresults
 
 
-def export2excel(dirname, filename, results2export, uname):
+def write_partial_results(dirname, lone_sw, merged_sw2sl):
+    ''' Write the results of one shard of a BOM check (see the --shard option)
+    to a Parquet file named bomcheck_shard_iofN.parquet.  Parquet is a
+    columnar file format.  The results of all the shards are later combined
+    by the function merge_partial_results.
+
+    Parmeters
+    =========
+
+    dirname: string
+        The directory to which the file is written.
+
+    lone_sw: dictionary
+        SW BOMs for which no SL BOM was found.  (see collect_checked_boms)
+
+    merged_sw2sl: dictionary
+        Merged SW/SL BOMs.  (see collect_checked_boms)
+
+    Returns
+    =======
+
+    out: string
+        Name of the file written.
+    '''
+    frames = []
+    for kind, dic in [('sw', lone_sw), ('merged', merged_sw2sl)]:
+        for k, df in dic.items():
+            df = df.reset_index()
+            df['__columns'] = json.dumps([str(c) for c in df.columns])  # this BOM's own columns
+            df.insert(0, 'assy', k)
+            df.insert(0, 'kind', kind)
+            frames.append(df)
+    df = pd.concat(frames, ignore_index=True, sort=False) if frames else pd.DataFrame(columns=['kind', 'assy'])
+    for col in df.columns:   # make each column one data type (required by Parquet)
+        if col in ['Op', 'Q', 'Q_sw', 'Q_sl']:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        elif df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    i, n = cfg['shard']
+    fn = os.path.join(dirname, 'bomcheck_shard_' + str(i) + 'of' + str(n) + '.parquet')
+    try:
+        df.to_parquet(fn, index=False)
+    except ImportError:
+        printStr = '\nError: writing shard results requires the pyarrow package.\n'
+        echo(printStr)
+        sys.exit(1)
+    printStr = '\nCreated file: ' + fn + '\n'
+    echo(printStr)
+    return fn
+
+
+def merge_partial_results(fnames):
+    ''' Combine the files written by the function write_partial_results.  If
+    an assembly was checked by more than one shard (a subassembly used in
+    assemblies of different shards), its results from the first file are
+    used.  Each assembly's results get back the columns they had when
+    written, no more and no less, so they are the same as those of a BOM
+    check that isn't sharded.
+
+    Parmeters
+    =========
+
+    fnames: list
+        Names of Parquet files written by write_partial_results.
+
+    Returns
+    =======
+
+    out: tuple
+        Two dictionaries like those returned by collect_checked_boms: 1. SW
+        BOMs for which no SL BOM was found.  2. Merged SW/SL BOMs.
+    '''
+    frames = []
+    for j, fn in enumerate(sorted(fnames)):
+        df = pd.read_parquet(fn)
+        df['__shard'] = j
+        frames.append(df)
+    lone_sw, merged_sw2sl = {}, {}
+    if not frames:
+        return lone_sw, merged_sw2sl
+    df = pd.concat(frames, ignore_index=True, sort=False)
+    first = df.groupby('assy')['__shard'].transform('min')
+    df = df[df['__shard'] == first].drop(columns='__shard')
+    for (kind, k), dfk in df.groupby(['kind', 'assy'], sort=False):
+        if '__columns' in dfk.columns:   # keep the columns the BOM had, even if empty
+            dfk = dfk[json.loads(dfk['__columns'].iloc[0])]
+        else:   # written by an older version
+            dfk = dfk.drop(columns=['kind', 'assy']).dropna(axis=1, how='all')
+        if kind == 'sw':
+            lone_sw[k] = dfk.set_index('Op')
+        else:
+            merged_sw2sl[k] = dfk.set_index('Item').fillna('')
+    return lone_sw, merged_sw2sl
+
+
+def merge_main(argv):
+    ''' Run from the command line like this: bomcheck merge [options] files.
+    Combine partial results written by shards (see the --shard option) and
+    create the usual bomcheck.xlsx file.
+
+    calls: merge_partial_results, concat_boms, export2excel
+    '''
+    parser = argparse.ArgumentParser(prog='bomcheck merge',
+                        description='Combine partial results of BOM checks run ' +
+                        'with the --shard option into one Excel file.')
+    parser.add_argument('filename', nargs='+', help='Names of the ' +
+                        'bomcheck_shard_iofN.parquet files.  An asterisk, *, ' +
+                        'captures multiple files.')
+    parser.add_argument('-c', '--sheets', action='store_true', default=False,
+                        help='Break up results across multiple sheets in the ' +
+                        'Excel file that is output.')
+    parser.add_argument('-o', '--output', default='bomcheck', help='Name ' +
+                        'of the Excel file to create', metavar='value')
+    parser.add_argument('-d', '--drop', action='store_true', default=False,
+                        help='Note in the Excel file that the shards were run ' +
+                        'with the drop list employed')
+    args = parser.parse_args(argv)
+    cfg['drop'] = args.drop
+    fnames = get_fnames(args.filename)
+    lone_sw, merged_sw2sl = merge_partial_results(fnames)
+    title_dfsw = list(lone_sw.items())
+    title_dfmerged = list(merged_sw2sl.items())
+    if not args.sheets:
+        title_dfsw, title_dfmerged = concat_boms(title_dfsw, title_dfmerged)
+    if title_dfsw or title_dfmerged:
+        dirname = os.path.dirname(os.path.abspath(fnames[0]))
+        export2excel(dirname, args.output, title_dfsw + title_dfmerged, 'unknown')
+
+
+def export2excel(dirname, filename, results2export, uname, openfile=True):
     '''Export to an Excel file the results of all the BOM checks.
 
-    calls: len2, autosize_excel_columns, autosize_excel_column_df, definefn...
+    calls: autosize_excel_columns, autosize_excel_column_df, definefn...
     (these functions are defined internally within the export2exel function)
 
     Parmeters
@@ -1259,27 +4364,19 @@ def export2excel(dirname, filename, results2export, uname):
     uname : string
         Username to attach to the footer of the Excel file.
 
+    openfile: bool
+        If True, open the Excel file once it has been created (MS Windows
+        only).  Default: True
+
     Returns
     =======
 
-    out: None
-        An Excel file will result named bomcheck.xlsx.
+    out: string
+        The name of the Excel file created, e.g. bomcheck.xlsx.
 
      \u2009
     '''
-    global printStrs
     
-    def len2(s):
-        ''' Extract from within a string either a decimal number truncated to two
-        decimal places, or an int value; then return the length of that substring.
-        Why used?  Q_sw, Q_sl, Q, converted to string, are on ocasion something
-        like 3.1799999999999997.  This leads to wrong length calc using len.'''
-        match = re.search(r"\d*\.\d\d|\d+", s)
-        if match:
-            return len(match.group())
-        else:
-            return 0
-
     def autosize_excel_columns(worksheet, df):
         ''' Adjust column width of an Excel worksheet (ref.: https://stackoverflow.com/questions/
             17326973/is-there-a-way-to-auto-adjust-excel-column-widths-with-pandas-excelwriter)'''
@@ -1292,30 +4389,22 @@ def export2excel(dirname, filename, results2export, uname):
             if df.columns[idx] in ['i', 'q', 'd', 'u']:
                 x = 0
             series = df[col]
-            if df.columns[idx][0] == 'Q':
-                max_len = max((
-                    series.astype(str).map(len2).max(),
-                    len(str(series.name))
-                )) + x
-            else:
-                max_len = max((
-                    series.astype(str).map(len).max(),
-                    len(str(series.name))
-                )) + x
+            max_len = max((
+                series.astype(str).map(len).max(),
+                len(str(series.name))
+            )) + x
             worksheet.set_column(idx+offset, idx+offset, max_len)
 
     def definefn(dirname, filename, i=0):
         ''' If bomcheck.xlsx slready exists, return bomcheck(1).xlsx.  If that
         exists, return bomcheck(2).xlsx...  and so forth.'''
-        global printStrs
         d, f = os.path.split(filename)
         f, e = os.path.splitext(f)
         if d:
             dirname = d   # if user specified a directory, use it instead
         if e and not e.lower()=='.xlsx':
             printStr = '\n(Output filename extension needs to be .xlsx' + '\nProgram aborted.\n'
-            printStrs += printStr
-            print(printStr)
+            echo(printStr)
             sys.exit(0)
         else:
             e = '.xlsx'
@@ -1350,6 +4439,7 @@ def export2excel(dirname, filename, results2export, uname):
                     + 'drop = ' + str(cfg['drop']) +  ', exceptions = ' + str(cfg['exceptions']))
         bomfooter = bomfooter + '&Rdrop: yes'
 
+    excelTitle = run_context().excelTitle
     if excelTitle and len(excelTitle) == 1:
         bomheader = '&C&A: ' + excelTitle[0][0] + ', ' + excelTitle[0][1]
     else:
@@ -1376,21 +4466,89 @@ def export2excel(dirname, filename, results2export, uname):
                 'comments': comment1 + comment2})
         writer.save()
     printStr = "\nCreated file: " + fn + '\n'
-    printStrs += printStr
-    print(printStr)
+    echo(printStr)
 
-    if sys.platform[:3] == 'win':  # Open bomcheck.xlsx in Excel when on Windows platform
+    if openfile and sys.platform[:3] == 'win':  # Open bomcheck.xlsx in Excel when on Windows platform
         try:
             os.startfile(os.path.abspath(fn))
         except:
             printStr = '\nAttempt to open bomcheck.xlsx in Excel failed.\n'
-            printStrs += printStr
-            print(printStr)
+            echo(printStr)
+    return fn
+
+
+def export_sharded(dirname, filename, results2export, uname, n=50):
+    ''' Instead of putting the BOMs of thousands of assemblies into one huge
+    Excel file, which is slow to write and slow to open, put them into
+    several Excel files, each containing n assemblies (one sheet per
+    assembly).  The files are written in parallel by a pool of processes.
+    Files are named bomcheck_001.xlsx, bomcheck_002.xlsx, etc.  Then an index
+    file, bomcheck_index.xlsx, is created.  It lists each assembly, the number
+    of Xs in its i, q, d, and u columns, and the file that contains it.
+
+    calls: export2excel, _export_shard
+
+    Parmeters
+    =========
+
+    dirname: string
+        The directory to which the Excel files are written.
+
+    filename: string
+        The base name of the Excel files, e.g. bomcheck.
+
+    results2export: list
+        List of tuples of the form [(assy1, df1), (assy2, df2), ...]  (see
+        the function export2excel)
+
+    uname: string
+        Username to attach to the footer of the Excel files.
+
+    n: int
+        Number of assemblies per file.  Default: 50
+
+    Returns
+    =======
+
+    out: string
+        Name of the index file.
+    '''
+    n = max(1, int(n))
+    results2export = [r for r in results2export if not r[1].empty]
+    groups = [results2export[i:i+n] for i in range(0, len(results2export), n)]
+    fname, _ = os.path.splitext(filename)
+    shardnames = [fname + '_' + str(j+1).zfill(3) for j in range(len(groups))]
+    with concurrent.futures.ProcessPoolExecutor() as pool:
+        futures = [pool.submit(_export_shard, run_context(), dirname, shardname, group, uname)
+                   for shardname, group in zip(shardnames, groups)]
+        created = [f.result() for f in futures]
+    index = []
+    for fn, group in zip(created, groups):
+        for title, df in group:
+            row = {'assy': title, 'rows': len(df)}
+            for col in ['i', 'q', 'd', 'u']:
+                row[col] = (df[col] == 'X').sum() if col in df.columns else ''
+            row['file'] = os.path.basename(fn)
+            index.append(row)
+        printStr = '\nCreated file: ' + fn + '\n'
+        echo(printStr)
+    dfindex = pd.DataFrame(index, columns=['assy', 'rows', 'i', 'q', 'd', 'u', 'file'])
+    return export2excel(dirname, fname + '_index', [('Index', dfindex.set_index('assy'))], uname)
+
+
+def _export_shard(ctx, dirname, filename, results2export, uname):
+    ''' Run in a separate process by export_sharded.  The run context of the
+    parent process is passed in because a new process starts with default
+    settings.  It is made quiet, since the parent reports the files
+    created.'''
+    ctx.quiet = True
+    return ctx.run(export2excel, dirname, filename, results2export, uname, openfile=False)
 
 # before program begins, create global variables
 set_globals()
 
 if __name__=='__main__':
+    multiprocessing.freeze_support()  # needed by the process pool in an EXE file
     main()                   # comment out this line for testing
     #bomcheck('*')   # use for testing #
 
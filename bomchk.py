@@ -10,11 +10,15 @@ Created on Wed Feb  6 21:18:58 2019
 
 
 import sys
+import collections
 #from PySide2.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QAbstractTableModel, QModelIndex
 from PyQt5.QtWidgets import (QAction, QApplication, QCheckBox, QLabel,
                              QMainWindow, QTextEdit, QPushButton, QHBoxLayout,
-                             QVBoxLayout)
+                             QVBoxLayout, QWidget, QFileDialog, QProgressBar,
+                             QTableView, QComboBox)
 from PyQt5.QtGui import QIcon, QPixmap
+import bomcheck
 
 
 #from PySide2.QtWidgets import (QWidget, QMainWindow, QAction, qApp, QApplication,
@@ -24,59 +28,201 @@ from PyQt5.QtGui import QIcon, QPixmap
 #from PySide2.QtGui import QIcon, QPixmap
 
 
-#class Dropbox(QLabel):
-#    def __init__(self):
-#        super().__init__()
-#        pixmap = QPixmap('icons/dragndrop.png') #https://pythonspot.com/pyqt5-image/
-#        self.setPixmap(pixmap)
-#        self.resize(pixmap.width(), pixmap.height())
-#        self.setAcceptDrops(True)
+class Dropbox(QLabel):
+    ''' A label showing a drag-and-drop image.  Files and folders dropped on
+    it are emitted by the filesDropped signal.'''
+    filesDropped = pyqtSignal(list)
 
-#    def dragEnterEvent(self, event):
-#        if event.mimeData().hasUrls():
-#            event.accept()
-#        else:
-#            event.ignore()
+    def __init__(self):
+        super().__init__()
+        pixmap = QPixmap('icons/dragndrop.png') #https://pythonspot.com/pyqt5-image/
+        self.setPixmap(pixmap)
+        self.resize(pixmap.width(), pixmap.height())
+        self.setAcceptDrops(True)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.accept()
+        else:
+            event.ignore()
+
+    def dropEvent(self, event):
+        files = [u.toLocalFile() for u in event.mimeData().urls()]
+        self.filesDropped.emit(files)
+
+
+class DataFrameModel(QAbstractTableModel):
+    ''' A table model over a pandas DataFrame.  Rows are handed to the view
+    batchsize rows at a time as the user scrolls (canFetchMore/fetchMore),
+    and cell values are read from a numpy array rather than from the
+    DataFrame, so that DataFrames with 100,000+ rows scroll smoothly.'''
+    batchsize = 500
+
+    def __init__(self, df=None, parent=None):
+        super().__init__(parent)
+        self.setDataFrame(df)
+
+    def setDataFrame(self, df):
+        self.beginResetModel()
+        if df is None:
+            self._columns, self._values = [], []
+        else:
+            self._columns = [str(c) for c in df.columns]
+            self._values = df.values
+        self._fetched = min(self.batchsize, len(self._values))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetched < len(self._values)
+
+    def fetchMore(self, parent=QModelIndex()):
+        n = min(self.batchsize, len(self._values) - self._fetched)
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + n - 1)
+        self._fetched += n
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return str(self._values[index.row(), index.column()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._columns[section]
+        return str(section + 1)
+
+
+class ResultsView(QWidget):
+    ''' Show the merged SW/SL BOMs returned by bomcheck.bomcheck, i.e. the
+    DataFrame indexed by (assy, Item), without the need to export them to
+    Excel.  The table can be filtered to show only rows with an X in the
+    i, q, d, or u columns, and/or only the rows of one assembly.'''
+    def __init__(self, df, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.df = df.reset_index()
+        self.mismatched = (self.df[['i', 'q', 'd', 'u']] == 'X').any(axis=1)
+
+        self.chkBox = QCheckBox('Mismatches only', self)
+        self.chkBox.stateChanged.connect(self.applyFilter)
+        self.assyBox = QComboBox(self)
+        self.assyBox.addItem('All assemblies')
+        self.assyBox.addItems(sorted(self.df['assy'].astype(str).unique()))
+        self.assyBox.currentIndexChanged.connect(self.applyFilter)
+        self.countLabel = QLabel(self)
+
+        self.model = DataFrameModel(parent=self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
 
-#    def dropEvent(self, event):
-#        files = [u.toLocalFile() for u in event.mimeData().urls()]
-#        for f in files:
-#            print(f)
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.chkBox)
+        hbox.addWidget(self.assyBox)
+        hbox.addStretch(1)
+        hbox.addWidget(self.countLabel)
+        vbox = QVBoxLayout()
+        vbox.addLayout(hbox)
+        vbox.addWidget(self.table)
+        self.setLayout(vbox)
+
+        self.applyFilter()
+        self.setGeometry(350, 350, 900, 600)
+        self.setWindowTitle('BOM Check Results')
+
+    def applyFilter(self):
+        filtr = self.mismatched if self.chkBox.isChecked() else True
+        if self.assyBox.currentIndex() > 0:
+            filtr = filtr & (self.df['assy'].astype(str) == self.assyBox.currentText())
+        df = self.df if filtr is True else self.df[filtr]
+        self.model.setDataFrame(df)
+        self.countLabel.setText(str(len(df)) + ' of ' + str(len(self.df)) + ' rows')
+
+
+class BomcheckWorker(QThread):
+    ''' Run bomcheck.bomcheck on a background thread so that the window
+    doesn't freeze while a BOM check is in progress.  Progress of the check
+    is reported via the progress signal: (stage, i, n, name).  Call
+    requestInterruption() to cancel the check; it stops between files,
+    between BOMs, and between stages.'''
+    progress = pyqtSignal(str, int, int, str)
+    done = pyqtSignal(str, object)
+
+    def __init__(self, files, drop=False, export=True, parent=None):
+        super().__init__(parent)
+        self.files = files
+        self.drop = drop
+        self.export = export
+
+    def run(self):
+        ctx = bomcheck.RunContext()   # this check's own settings and messages
+        try:
+            results = ctx.run(bomcheck.bomcheck, self.files, d=self.drop, x=self.export,
+                              progress=self.progress.emit,
+                              cancel=self.isInterruptionRequested)
+        except Exception as e:
+            results = None
+            ctx.add('\nBOM check failed: ' + str(e) + '\n')
+        self.done.emit(ctx.printStrs, results)
 
 
 class BChkWindow(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.pending = []                  # files/folders for the next job
+        self.jobs = collections.deque()    # jobs waiting for the worker
+        self.worker = None
+        self.resultsViews = []
         self.initUI()
 
     def initUI(self):
-        global useDrop
+        self.runButton = QPushButton("Run", self)
+        self.runButton.clicked.connect(self.runBomcheck)
 
-        #self.runButton = QPushButton("Run", self)
-        #self.runButton.clicked.connect(self.runBomcheck)
-        #self.runButton.move(15, 25)
+        self.cancelButton = QPushButton("Cancel", self)
+        self.cancelButton.clicked.connect(self.cancelBomcheck)
+        self.cancelButton.setEnabled(False)
+
+        self.chkBox = QCheckBox('Use Drop', self)
+        self.exportBox = QCheckBox('Excel file', self)
+        self.exportBox.setChecked(True)
+        self.viewBox = QCheckBox('Show results', self)
+        self.viewBox.setChecked(True)
+
+        dragAndDrop = Dropbox()
+        dragAndDrop.filesDropped.connect(self.addFiles)
+
+        self.progressBar = QProgressBar(self)
+        self.progressBar.setValue(0)
 
         self.textEdit = QTextEdit(self)
+        self.textEdit.setReadOnly(True)
 
         hbox = QHBoxLayout()
+        hbox.addWidget(self.runButton)
+        hbox.addWidget(self.cancelButton)
+        hbox.addWidget(self.chkBox)
+        hbox.addWidget(self.exportBox)
+        hbox.addWidget(self.viewBox)
         hbox.addStretch(1)
-        hbox.addWidget(self.textEdit)
-        #hbox.addWidget(self.runbutton)
 
         vbox = QVBoxLayout()
-        vbox.addStretch(1)
         vbox.addLayout(hbox)
+        vbox.addWidget(dragAndDrop)
+        vbox.addWidget(self.progressBar)
+        vbox.addWidget(self.textEdit)
 
-        self.setCentralWidget(vbox)
+        central = QWidget(self)
+        central.setLayout(vbox)
+        self.setCentralWidget(central)
         self.statusBar()
 
-
-# =============================================================================
-#         self.textEdit = QTextEdit()
-#         self.setCentralWidget(self.textEdit)
-#         self.statusBar()
-#
-# =============================================================================
         openFile = QAction(QIcon('/home/ken/projects/project1/icons/open.png'),
                            'Open', self)
         openFile.setShortcut('Ctrl+O')
@@ -93,61 +239,81 @@ class BChkWindow(QMainWindow):
         fileMenu.addAction(openFile)
         fileMenu.addAction(exitAct)
 
-
-
-# =============================================================================
-#         chkBox = QCheckBox('Use Drop', self)
-#         chkBox.stateChanged.connect(self.changeUseDrop)
-#         chkBox.move(150,25)
-# =============================================================================
-# =============================================================================
-#         dragAndDrop = QLabel(self)
-#         pixmap = QPixmap('icons/dragndrop.png') #https://pythonspot.com/pyqt5-image/
-#         dragAndDrop.setPixmap(pixmap)
-#         dragAndDrop.resize(pixmap.width(), pixmap.height())
-#         dragAndDrop.move(15, 65)
-#         dragAndDrop.setAcceptDrops(True)
-#
-#         dragAndDrop = Dropbox()
-#         dragAndDrop.move(15, 65)
-# =============================================================================
-
 # =============================================================================
 #         helpMenu = menubar.addMenu('&Help')
-#         self.setAcceptDrops(True)
 # =============================================================================
 
-        self.setGeometry(300, 300, 350, 300)
+        self.setGeometry(300, 300, 500, 450)
         self.setWindowTitle('Dekker BOM Check')
         self.setWindowIcon(QIcon('icons/dekker.ico'))
         self.show()
 
-
-    #def changeUseDrop(self, state):
-    #    if state == Qt.Checked:
-    #        useDrop = True
-    #    else:
-    #        useDrop = False
-
-
+    def addFiles(self, files):
+        ''' Add files and/or folders to those that will be checked when the
+        Run button is next pressed.'''
+        self.pending += files
+        self.textEdit.append('\n'.join(files))
+        self.statusBar().showMessage(str(len(self.pending)) + ' file(s)/folder(s) queued')
 
     def runBomcheck(self):
-        pass
+        ''' Turn the queued files into a job and start it, or, if a check is
+        already running, start it when that check is done.'''
+        if self.pending:
+            self.jobs.append((self.pending, self.chkBox.isChecked(),
+                              self.exportBox.isChecked()))
+            self.pending = []
+        if self.worker is None:
+            self.startNextJob()
+        else:
+            self.statusBar().showMessage(str(len(self.jobs)) + ' job(s) waiting')
+
+    def startNextJob(self):
+        if not self.jobs:
+            self.statusBar().showMessage('Ready')
+            return
+        files, drop, export = self.jobs.popleft()
+        self.worker = BomcheckWorker(files, drop, export, self)
+        self.worker.progress.connect(self.showProgress)
+        self.worker.done.connect(self.bomcheckDone)
+        self.progressBar.setValue(0)
+        self.cancelButton.setEnabled(True)
+        self.worker.start()
+
+    def cancelBomcheck(self):
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.statusBar().showMessage('Cancelling...')
+
+    def showProgress(self, stage, i, n, name):
+        ''' Reading files is shown as the first half of the progress bar,
+        and comparing BOMs as the second half.'''
+        offset = 0 if stage == 'read' else 50
+        if n:
+            self.progressBar.setValue(offset + int(50 * i / n))
+        self.statusBar().showMessage(stage + ': ' + name)
+
+    def bomcheckDone(self, output, results):
+        self.textEdit.append(output)
+        if self.viewBox.isChecked() and results and results[1] is not None:
+            view = ResultsView(results[1], self)
+            self.resultsViews.append(view)
+            view.show()
+        self.progressBar.setValue(100)
+        self.cancelButton.setEnabled(False)
+        self.worker.wait()
+        self.worker = None
+        self.startNextJob()
 
     def showDialog(self):
         fname = QFileDialog.getOpenFileNames(self, 'Open file', '/home')
         if fname[0]:
-            print(fname[0])
-            s = ''
-            for f in fname[0]:
-                s += f + '\n'
-            self.textEdit.setText(s)
-
-            #f = open(fname[0], 'r')
+            self.addFiles(fname[0])
 
-            #with f:
-            #    data = f.read()
-            #    self.textEdit.setText(data)
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker.wait()
+        event.accept()
 
 
 if __name__ == '__main__':
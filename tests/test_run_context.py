@@ -0,0 +1,59 @@
+''' Stress test of run contexts: BOM checks with different settings done at
+the same time in different threads must not see each other's settings,
+messages, or BOM titles.'''
+
+import os
+import sys
+import concurrent.futures
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bomcheck
+
+
+def make_boms(dirname, i):
+    ''' Write to dirname a SW and a SL BOM of assy 08595i, and a SW BOM,
+    99000i, that has no matching SL BOM.'''
+    sw = pd.DataFrame([['1', 2, '3086-0100-001', 'BOLT'],
+                       ['2', 1, '3086-0200-001', 'NUT']],
+                      columns=['ITEM NO.', 'QTY', 'PART NUMBER', 'DESCRIPTION'])
+    sl = pd.DataFrame([[0, '08595' + str(i), 'ASSY ' + str(i), 1, 'EA'],
+                       [1, '3086-0100-001', 'BOLT', 2, 'EA'],
+                       [1, '3086-0200-001', 'NUT', 1, 'EA']],
+                      columns=['Level', 'Item', 'Description', 'Qty Per', 'UM'])
+    sw.to_excel(os.path.join(dirname, '08595' + str(i) + '_sw.xlsx'), index=False, startrow=1)
+    sl.to_excel(os.path.join(dirname, '08595' + str(i) + '_sl.xlsx'), index=False)
+    sw.to_excel(os.path.join(dirname, '99000' + str(i) + '_sw.xlsx'), index=False, startrow=1)
+
+
+def check(dirname, i):
+    ''' Do a BOM check in a new run context with settings particular to i.'''
+    ctx = bomcheck.RunContext()
+    ctx.run(bomcheck.bomcheck, dirname, x=False, a=i, cs=1000 + i)
+    return ctx
+
+
+def test_concurrent_checks_are_isolated(tmp_path):
+    n = 8
+    dirs = []
+    for i in range(n):
+        d = tmp_path / str(i)
+        d.mkdir()
+        make_boms(str(d), i)
+        dirs.append(str(d))
+    default_accuracy = bomcheck.cfg['accuracy']
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n) as executor:
+        futures = [executor.submit(check, d, i) for rnd in range(3)
+                   for i, d in enumerate(dirs)]
+        contexts = [(i, f.result()) for f, i in zip(futures, list(range(n)) * 3)]
+
+    for i, ctx in contexts:
+        assert ctx.cfg['accuracy'] == i
+        assert ctx.cfg['chunksize'] == 1000 + i
+        assert '99000' + str(i) + '_sw' in ctx.printStrs
+        others = [j for j in range(n) if j != i]
+        assert not any('99000' + str(j) + '_sw' in ctx.printStrs for j in others)
+        assert ctx.excelTitle == [('08595' + str(i), 'ASSY ' + str(i))]
+    assert bomcheck.cfg['accuracy'] == default_accuracy